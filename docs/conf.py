@@ -1,7 +1,3 @@
-import os
-import sys
-
-sys.path.insert(0, os.path.abspath("../src"))
 # Configuration file for the Sphinx documentation builder.
 #
 # For the full list of built-in configuration values, see the documentation:
@@ -19,9 +15,7 @@ release = "0.1"
 # https://www.sphinx-doc.org/en/master/usage/configuration.html#general-configuration
 
 extensions = [
-    "sphinx.ext.autodoc",
-    "sphinx.ext.viewcode",
-    "sphinx_autodoc_typehints",
+    "autoapi.extension",
     "sphinx.ext.napoleon",
     "sphinx.ext.intersphinx",
 ]
@@ -29,7 +23,17 @@ extensions = [
 templates_path = ["_templates"]
 exclude_patterns = ["_build", "Thumbs.db", ".DS_Store"]
 
-autodoc_typehints = "description"
+# autoapi parses the sources statically, so building the docs doesn't import
+# ledge or need its runtime dependencies (psycopg2, typer, ...) installed
+autoapi_type = "python"
+autoapi_dirs = ["../src/ledge"]
+autoapi_options = [
+    "members",
+    "undoc-members",
+    "show-inheritance",
+    "inherited-members",
+]
+autoapi_add_toctree_entry = False
 add_module_names = False
 
 napoleon_google_docstring = True
@@ -38,16 +42,23 @@ napoleon_google_docstring = True
 intersphinx_mapping = {
     "python": ("https://docs.python.org/3", None),
 }
-autodoc_type_aliases = {
-    "Decimal": "decimal.Decimal",
-    "Optional": "typing.Optional",
-    "datetime": "~datetime.datetime",
-    "List": "typing.List",
-}
 html_theme = "sphinx_rtd_theme"
 html_static_path = ["_static"]
 
 
+# documented by hand in ledge.domain.rst, autoapi can't describe NewTypes
+_HAND_WRITTEN = {
+    f"ledge.domain.models.{name}"
+    for name in ("AccountID", "CommodityID", "TransactionID", "SplitID")
+}
+
+
+def skip_hand_written(app, what, name, obj, skip, options):
+    """Leave objects documented in a hand-written page out of the API reference."""
+    return True if name in _HAND_WRITTEN else skip
+
+
 def setup(app):
-    """Add custom CSS file to the HTML output."""
+    """Add custom CSS file to the HTML output and hook into autoapi."""
     app.add_css_file("custom.css")
+    app.connect("autoapi-skip-member", skip_hand_written)
@@ -0,0 +1,117 @@
+import sys
+from collections.abc import Callable, Sequence
+from functools import lru_cache
+from typing import TYPE_CHECKING, TypeVar
+
+import typer
+
+if TYPE_CHECKING:
+    from rich.console import Console
+
+T = TypeVar("T")
+
+TABLE_CHUNK_ROWS = 500
+
+
+@lru_cache(maxsize=None)
+def console() -> "Console":
+    """Return the console shared by every CLI command.
+
+    It is created on first use, which keeps rich off the import path and
+    probes the terminal only once per process.
+    """
+    from rich.console import Console
+
+    return Console()
+
+
+def print_table(
+    title: str,
+    columns: Sequence[tuple[str, str | None]],
+    items: Sequence[T],
+    row: Callable[[T], Sequence[str]],
+) -> None:
+    """Print items as a rich table, rendering at most ``TABLE_CHUNK_ROWS`` at a time.
+
+    rich lays out a whole table before writing any of it, so long listings are
+    split into consecutive tables. Only the first carries the title and header.
+    Column widths are measured in a first pass over all rows and fixed, so the
+    chunks line up as one table. Rows are built again for each chunk rather
+    than kept, so only one chunk of rich cells is held at a time.
+
+    Args:
+        title (str): Table title.
+        columns (Sequence[tuple[str, str | None]]): (header, style) per column.
+        items (Sequence[T]): The items to list, one row each.
+        row (Callable[[T], Sequence[str]]): Builds an item's cell values, in
+            rich markup.
+    """
+    from rich.table import Table
+    from rich.text import Text
+
+    widths = [len(header) for header, _ in columns]
+    for item in items:
+        for i, cell in enumerate(row(item)):
+            widths[i] = max(widths[i], Text.from_markup(cell).cell_len)
+
+    for start in range(0, len(items), TABLE_CHUNK_ROWS):
+        table = Table(
+            title=None if start else title,
+            show_header=not start,
+            header_style="bold cyan",
+        )
+        for (header, style), width in zip(columns, widths):
+            table.add_column(header, style=style, width=width)
+        for item in items[start : start + TABLE_CHUNK_ROWS]:
+            table.add_row(*row(item))
+        console().print(table)
+
+
+def choice(message: str, options: Sequence[tuple[T, str]]) -> T | None:
+    """Ask the user to pick one of the given (value, label) options.
+
+    On a terminal this shows prompt_toolkit's interactive picker. When stdin is
+    not a TTY (e.g. answers piped in by a script) prompt_toolkit is never
+    imported, and one line is read from stdin and matched against the option
+    labels or values instead.
+
+    Returns:
+        T | None: The chosen value, or None if stdin is exhausted.
+
+    Raises:
+        typer.BadParameter: If the line read from stdin matches no option.
+    """
+    if sys.stdin.isatty():
+        from prompt_toolkit.shortcuts import choice as prompt_choice
+
+        return prompt_choice(message=message, options=options)
+
+    line = sys.stdin.readline()
+    if not line:
+        return None
+    answer = line.strip()
+    for value, label in options:
+        if answer in (label, str(value)):
+            return value
+    valid = ", ".join(label for _, label in options)
+    raise typer.BadParameter(f"{answer!r} is not one of: {valid}")
+
+
+def attach_repo(ctx: typer.Context, repo_type: str) -> None:
+    """Open the repository selected by ``repo_type`` and attach it to the context.
+
+    The repository is closed again when the context is torn down.
+
+    Raises:
+        typer.BadParameter: If ``repo_type`` is not a supported repository.
+    """
+    if repo_type != "postgres":
+        raise typer.BadParameter(
+            f"Unsupported repo type {repo_type!r}.", param_hint="'--repo-type'"
+        )
+    from ..repository.postgresql import PostgreSQLRepository
+
+    repo = PostgreSQLRepository()
+    repo.open()
+    ctx.obj = repo
+    ctx.call_on_close(repo.close)
@@ -1,17 +1,17 @@
 import typer
-from rich.console import Console
-from rich.table import Table
 from datetime import datetime
-from ..repository.postgresql import PostgreSQLRepository
 from ..domain import models
-from prompt_toolkit.shortcuts import choice
-
-console = Console()
+from ._common import attach_repo, print_table, choice, console
 
 app = typer.Typer(
     help="Tool for managing accounts.",
 )
 
+# The picker hands back the enum member itself, so no value lookup is needed.
+_ACCOUNT_TYPE_CHOICES = tuple(
+    (account_type, account_type.name) for account_type in models.AccountTypeEnum
+)
+
 
 @app.callback()
 def main(
@@ -21,18 +21,7 @@ def main(
     ),
 ) -> None:
     """We set up the repo here and attach it to the context."""
-    if repo_type == "postgres":
-        repo = PostgreSQLRepository()
-        repo.open()
-    else:
-        pass
-
-    ctx.obj = repo
-
-    def cleanup() -> None:
-        repo.close()
-
-    ctx.call_on_close(cleanup)
+    attach_repo(ctx, repo_type)
 
 
 @app.command()
@@ -45,39 +34,35 @@ def list(
     accounts = ctx.obj.get_accounts()
 
     if not accounts:
-        console.print("[dim]No accounts found.[/dim]")
+        console().print("[dim]No accounts found.[/dim]")
         return
 
-    table = Table(title="Accounts", show_header=True, header_style="bold cyan")
+    columns = [("Name", "bold"), ("Description", None)]
     if verbose:
-        table.add_column("ID", style="dim")
-    table.add_column("Name", style="bold")
-    table.add_column("Description")
-
-    for account in accounts:
-        if verbose:
-            table.add_row(
-                str(account.id), account.name, account.description or "[dim]None[/dim]"
-            )
-        else:
-            table.add_row(account.name, account.description or "[dim]None[/dim]")
-
-    console.print(table)
+        columns.insert(0, ("ID", "dim"))
+    print_table(
+        "Accounts",
+        columns,
+        accounts,
+        lambda account: (
+            *((str(account.id),) if verbose else ()),
+            account.name,
+            account.description or "[dim]None[/dim]",
+        ),
+    )
 
 
 @app.command()
 def open(ctx: typer.Context) -> None:
     """A CLI prompt tool to open a new account."""
     print()
-    console.print("[bold cyan]Open a New Account[/bold cyan]")
+    console().print("[bold cyan]Open a New Account[/bold cyan]")
     name = typer.prompt("Account Name")
     description = typer.prompt("Account Description", default="")
-    choices = [
-        (account_type.value, account_type.name)
-        for account_type in models.AccountTypeEnum
-    ]
-    acct_type = choice("Account Type", options=choices)
-    print(acct_type)
+    acct_type = choice("Account Type", options=_ACCOUNT_TYPE_CHOICES)
+    if acct_type is None:
+        console().print("[yellow]Cancelled.[/yellow]")
+        return
     open_date = typer.prompt("Open Date (YYYY-MM-DD)", default="")
     try:
         # parse open_date to datetime or set to None
@@ -86,12 +71,12 @@ def open(ctx: typer.Context) -> None:
         account = models.AccountCreate(
             name=name,
             description=description if description else None,
-            type=models.AccountTypeEnum(acct_type),
+            type=acct_type,
             open_date=open_date_dt,
         )
         new_account = ctx.obj.open_account(account)
-        console.print(
+        console().print(
             f"[green]Account '{name}' created with ID {new_account.id}.[/green]"
         )
     except ValueError as e:
-        console.print(f"[red]Error: {e}[/red]")
+        console().print(f"[red]Error: {e}[/red]")
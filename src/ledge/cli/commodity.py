@@ -1,11 +1,6 @@
 import typer
-from rich.console import Console
-from rich.table import Table
-from rich.prompt import Confirm
-from ..repository.postgresql import PostgreSQLRepository
 from ..domain import models
-
-console = Console()
+from ._common import attach_repo, print_table, console
 
 app = typer.Typer(
     help="Tool for managing commodities.",
@@ -20,18 +15,7 @@ def main(
     ),
 ) -> None:
     """We set up the repo here and attach it to the context."""
-    if repo_type == "postgres":
-        repo = PostgreSQLRepository()
-        repo.open()
-    else:
-        pass
-
-    ctx.obj = repo
-
-    def cleanup() -> None:
-        repo.close()
-
-    ctx.call_on_close(cleanup)
+    attach_repo(ctx, repo_type)
 
 
 @app.command()
@@ -43,26 +27,22 @@ def list(
     commodities = ctx.obj.get_commodities()
 
     if not commodities:
-        console.print("[dim]No commodities found.[/dim]")
+        console().print("[dim]No commodities found.[/dim]")
         return
 
-    table = Table(title="Commodities", show_header=True, header_style="bold cyan")
+    columns = [("Name", "bold"), ("Description", None)]
     if verbose:
-        table.add_column("ID", style="dim")
-    table.add_column("Name", style="bold")
-    table.add_column("Description")
-
-    for commodity in commodities:
-        if verbose:
-            table.add_row(
-                str(commodity.id),
-                commodity.name,
-                commodity.description or "[dim]None[/dim]",
-            )
-        else:
-            table.add_row(commodity.name, commodity.description or "[dim]None[/dim]")
-
-    console.print(table)
+        columns.insert(0, ("ID", "dim"))
+    print_table(
+        "Commodities",
+        columns,
+        commodities,
+        lambda commodity: (
+            *((str(commodity.id),) if verbose else ()),
+            commodity.name,
+            commodity.description or "[dim]None[/dim]",
+        ),
+    )
 
 
 @app.command()
@@ -77,8 +57,10 @@ def add(
     ),
 ) -> None:
     """Add a new commodity."""
+    from rich.prompt import Confirm
+
     print()
-    console.print("[bold cyan]New Commodity[/bold cyan]\n")
+    console().print("[bold cyan]New Commodity[/bold cyan]\n")
     if description == "":
         description = None
 
@@ -86,18 +68,18 @@ def add(
     prefix_str = "[green]Yes[/green]" if prefix else "[red]No[/red]"
     desc_str = description or "[dim]None[/dim]"
 
-    console.print(f'[bold]Name:[/bold] [green]"{name}"[/green]')
-    console.print(f"[bold]Prefix:[/bold] {prefix_str}")
-    console.print(f"[bold]Description:[/bold] {desc_str}")
+    console().print(f'[bold]Name:[/bold] [green]"{name}"[/green]')
+    console().print(f"[bold]Prefix:[/bold] {prefix_str}")
+    console().print(f"[bold]Description:[/bold] {desc_str}")
 
     if Confirm.ask("\nAdd this commodity?", default=True):
         commodity_create = models.CommodityCreate(
             name=name, prefix=prefix, description=description
         )
         ctx.obj.add_commodity(commodity_create)
-        console.print("[green]✓[/green] Commodity added successfully!")
+        console().print("[green]✓[/green] Commodity added successfully!")
     else:
-        console.print("[yellow]Cancelled.[/yellow]")
+        console().print("[yellow]Cancelled.[/yellow]")
 
 
 if __name__ == "__main__":
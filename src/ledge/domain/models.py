@@ -46,7 +46,7 @@ class AccountStatusEnum(str, Enum):
 
 
 # Commodity
-@dataclass(kw_only=True)
+@dataclass(kw_only=True, slots=True, frozen=True)
 class _CommodityBase:
     """Base class for commodities.
 
@@ -60,14 +60,14 @@ class _CommodityBase:
     description: Optional[str] = None
 
 
-@dataclass(kw_only=True)
+@dataclass(kw_only=True, slots=True, frozen=True)
 class CommodityCreate(_CommodityBase):
     """Used when creating a new commodity (No ID yet)."""
 
     pass
 
 
-@dataclass(kw_only=True)
+@dataclass(kw_only=True, slots=True, frozen=True)
 class Commodity(_CommodityBase):
     """Represents a commodity with an assigned ID.
 
@@ -79,7 +79,7 @@ class Commodity(_CommodityBase):
 
 
 # Account
-@dataclass(kw_only=True)
+@dataclass(kw_only=True, slots=True, frozen=True)
 class _AccountBase:
     """Base class for accounts.
 
@@ -97,7 +97,7 @@ class _AccountBase:
     description: Optional[str] = None
 
 
-@dataclass(kw_only=True)
+@dataclass(kw_only=True, slots=True, frozen=True)
 class AccountCreate(_AccountBase):
     """Used when creating a new account (No ID yet).
 
@@ -108,7 +108,7 @@ class AccountCreate(_AccountBase):
     open_date: datetime.datetime
 
 
-@dataclass(kw_only=True)
+@dataclass(kw_only=True, slots=True, frozen=True)
 class Account(_AccountBase):
     """Represents an account with an assigned ID.
 
@@ -119,7 +119,7 @@ class Account(_AccountBase):
     id: AccountID
 
 
-@dataclass(kw_only=True)
+@dataclass(kw_only=True, slots=True)
 class AccountStatus:
     """Represents the status of an account.
 
@@ -135,7 +135,7 @@ class AccountStatus:
 
 
 # Split
-@dataclass(kw_only=True)
+@dataclass(kw_only=True, slots=True)
 class _SplitBase:
     """Represents a split in a transaction.
 
@@ -150,14 +150,14 @@ class _SplitBase:
     account_id: AccountID
 
 
-@dataclass(kw_only=True)
+@dataclass(kw_only=True, slots=True)
 class SplitCreate(_SplitBase):
     """Used when creating a new split (No ID yet)."""
 
     pass
 
 
-@dataclass(kw_only=True)
+@dataclass(kw_only=True, slots=True)
 class Split(_SplitBase):
     """Represents a split with an assigned ID.
 
@@ -169,7 +169,7 @@ class Split(_SplitBase):
     transaction_id: TransactionID
 
 
-@dataclass(kw_only=True)
+@dataclass(kw_only=True, slots=True)
 class _TransactionBase:
     """Base class for transactions.
 
@@ -184,7 +184,7 @@ class _TransactionBase:
     notes: Optional[str] = None
 
 
-@dataclass(kw_only=True)
+@dataclass(kw_only=True, slots=True)
 class TransactionCreate(_TransactionBase):
     """Used when creating a new transaction (No ID yet).
 
@@ -195,7 +195,7 @@ class TransactionCreate(_TransactionBase):
     splits: list[SplitCreate]
 
 
-@dataclass(kw_only=True)
+@dataclass(kw_only=True, slots=True)
 class Transaction(_TransactionBase):
     """Represents a transaction with an assigned ID.
 
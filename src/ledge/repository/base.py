@@ -1,11 +1,18 @@
-from abc import ABC, abstractmethod
+import datetime
+from collections.abc import Iterator
+from contextlib import AbstractContextManager
+from typing import Protocol
 from ..domain import models
 
 
-class AbstractRepository(ABC):
-    """Abstract base class for a repository handling commodities, accounts, and transactions."""
+class Repository(Protocol):
+    """Interface for a repository handling commodities, accounts, and transactions.
+
+    Implementations only need to match these methods structurally, but may
+    subclass Repository explicitly to have mypy check them against it and to
+    inherit the docstrings through :func:`ledge.utils.doc_inherit`.
+    """
 
-    @abstractmethod
     def create(self) -> None:
         """Create the necessary data for a new repository.
 
@@ -14,7 +21,6 @@ class AbstractRepository(ABC):
             ConnectionError: If the connection to the repository fails.
         """
 
-    @abstractmethod
     def open(self) -> None:
         """Open a connection to the repository defined in the configuration.
 
@@ -22,11 +28,16 @@ class AbstractRepository(ABC):
             ConnectionError: If the connection to the repository fails.
         """
 
-    @abstractmethod
     def close(self) -> None:
         """Close the connection to the repository."""
 
-    @abstractmethod
+    def transaction(self) -> AbstractContextManager[None]:
+        """Group the writes made inside the ``with`` block into one transaction.
+
+        The writes are committed together when the block exits normally and
+        discarded if it raises. Nested uses join the outermost transaction.
+        """
+
     def add_commodity(self, commodity: models.CommodityCreate) -> models.Commodity:
         """Add a new commodity to the repository.
 
@@ -40,7 +51,6 @@ class AbstractRepository(ABC):
             RuntimeError: If we were unable to add the commodity.
         """
 
-    @abstractmethod
     def get_commodity(
         self, commodity_id: models.CommodityID
     ) -> models.Commodity | None:
@@ -53,7 +63,6 @@ class AbstractRepository(ABC):
             models.Commodity | None: The commodity with the given ID, or None if not found.
         """
 
-    @abstractmethod
     def get_commodities(self) -> list[models.Commodity]:
         """Retrieve all commodities from the repository.
 
@@ -61,7 +70,6 @@ class AbstractRepository(ABC):
             list[models.Commodity]: A list of all commodities.
         """
 
-    @abstractmethod
     def open_account(self, account: models.AccountCreate) -> models.Account:
         """Open a new account in the repository. Also creates the associated open status.
 
@@ -75,15 +83,44 @@ class AbstractRepository(ABC):
             RuntimeError: If we were unable to open the account.
         """
 
-    @abstractmethod
-    def get_accounts(self) -> list[models.Account]:
-        """Retrieve all accounts from the repository.
+    def open_accounts(
+        self, accounts: list[models.AccountCreate]
+    ) -> list[models.Account]:
+        """Open many accounts at once, each with its associated open status.
+
+        Args:
+            accounts (list[models.AccountCreate]): The accounts to open.
+
+        Returns:
+            list[models.Account]: The opened accounts, in the given order.
+        """
+
+    def get_accounts(
+        self, after: models.AccountID | None = None, limit: int | None = None
+    ) -> list[models.Account]:
+        """Retrieve all accounts from the repository, ordered by ID.
+
+        Pages are fetched by passing the ID of the last account of the
+        previous page as ``after``.
+
+        Args:
+            after (models.AccountID | None): Only return accounts with a greater ID.
+            limit (int | None): Maximum number of accounts to return, unlimited if None.
 
         Returns:
             list[models.Account]: A list of all accounts.
         """
 
-    @abstractmethod
+    def get_accounts_and_commodities(
+        self,
+    ) -> tuple[list[models.Account], list[models.Commodity]]:
+        """Retrieve all accounts and all commodities in a single request.
+
+        Returns:
+            tuple[list[models.Account], list[models.Commodity]]: All accounts and
+            all commodities.
+        """
+
     def get_account_by_id(self, account_id: models.AccountID) -> models.Account | None:
         """Retrieve an account by its ID.
 
@@ -94,7 +131,6 @@ class AbstractRepository(ABC):
             models.Account | None: The account with the given ID, or None if not found.
         """
 
-    @abstractmethod
     def get_account_by_name(self, account_name: str) -> list[models.Account]:
         """Retrieve a list of accounts that contain the given name.
 
@@ -105,7 +141,6 @@ class AbstractRepository(ABC):
             list[models.Account]: A list of accounts matching the given name.
         """
 
-    @abstractmethod
     def set_account_status(self, status: models.AccountStatus) -> models.AccountStatus:
         """Set the status of an account.
 
@@ -116,7 +151,18 @@ class AbstractRepository(ABC):
             models.AccountStatus: The added account status.
         """
 
-    @abstractmethod
+    def set_account_statuses(
+        self, statuses: list[models.AccountStatus]
+    ) -> list[models.AccountStatus]:
+        """Set many account statuses at once, e.g. when backfilling history.
+
+        Args:
+            statuses (list[models.AccountStatus]): The account statuses to add.
+
+        Returns:
+            list[models.AccountStatus]: The added account statuses.
+        """
+
     def get_status_by_account(
         self, account_id: models.AccountID
     ) -> list[models.AccountStatus]:
@@ -129,20 +175,49 @@ class AbstractRepository(ABC):
             list[models.AccountStatus]: A list of account statuses.
         """
 
-    @abstractmethod
     def get_transactions(
-        self, account_id: models.AccountID
+        self,
+        account_id: models.AccountID,
+        after: tuple[datetime.datetime, models.TransactionID] | None = None,
+        limit: int | None = None,
     ) -> list[models.Transaction]:
-        """Retrieve all transactions for a given account.
+        """Retrieve all transactions for a given account, newest first.
+
+        Pages are fetched by passing the (date, id) of the last transaction of
+        the previous page as ``after``.
 
         Args:
             account_id (models.AccountID): The ID of the account.
+            after (tuple[datetime.datetime, models.TransactionID] | None): Only return
+                transactions that come after this (date, id) key.
+            limit (int | None): Maximum number of transactions to return, unlimited if None.
 
         Returns:
             list[models.Transaction]: A list of transactions.
         """
 
-    @abstractmethod
+    def iter_transactions(
+        self, account_id: models.AccountID
+    ) -> Iterator[models.Transaction]:
+        """Stream all transactions for a given account.
+
+        Same as ``get_transactions``, but transactions are yielded as they are
+        read instead of being loaded into memory all at once.
+
+        The stream does not hold a transaction open. Writes made through the
+        same repository while iterating are committed as usual, several streams
+        can be consumed together, and a stream started inside ``transaction()``
+        may outlive the block. The stream reads the data as it was when
+        iteration started. It fails if it was started inside a ``transaction()``
+        block that is rolled back. Closing the repository closes its streams.
+
+        Args:
+            account_id (models.AccountID): The ID of the account.
+
+        Yields:
+            models.Transaction: The transactions, in the same order as ``get_transactions``.
+        """
+
     def add_transaction(
         self, transaction: models.TransactionCreate
     ) -> models.Transaction:
@@ -154,3 +229,18 @@ class AbstractRepository(ABC):
         Returns:
             models.Transaction: The added transaction.
         """
+
+    def add_transactions(
+        self, transactions: list[models.TransactionCreate]
+    ) -> list[models.Transaction]:
+        """Add many transactions to the repository at once.
+
+        Intended for imports and other bulk loads, where adding the
+        transactions one by one would be slow.
+
+        Args:
+            transactions (list[models.TransactionCreate]): The transactions to add.
+
+        Returns:
+            list[models.Transaction]: The added transactions, in the given order.
+        """
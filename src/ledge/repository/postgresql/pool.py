@@ -0,0 +1,67 @@
+import atexit
+import os
+import threading
+from typing import Any
+
+from psycopg2.pool import ThreadedConnectionPool
+
+MIN_CONNECTIONS = 1
+MAX_CONNECTIONS = 20
+
+_pools: dict[tuple[tuple[str, Any], ...], ThreadedConnectionPool] = {}
+_lock = threading.Lock()
+
+
+def get_pool(**conninfo: Any) -> ThreadedConnectionPool:
+    """Return the process-wide connection pool for the given connection parameters.
+
+    Pools are created on first use and shared by every repository that
+    connects with the same parameters, so only the first ``open()`` pays
+    for the TCP and authentication handshake. The pool size defaults to
+    ``MIN_CONNECTIONS``..``MAX_CONNECTIONS`` and can be overridden with the
+    ``postgres_pool_min`` and ``postgres_pool_max`` environment variables.
+
+    Args:
+        **conninfo: Keyword arguments accepted by ``psycopg2.connect``.
+
+    Returns:
+        ThreadedConnectionPool: The pool for the given parameters.
+
+    Raises:
+        psycopg2.Error: If the pool's initial connection fails.
+        ValueError: If a pool size environment variable is not an integer.
+    """
+    key = tuple(sorted(conninfo.items()))
+    with _lock:
+        pool = _pools.get(key)
+        if pool is None or pool.closed:
+            pool = ThreadedConnectionPool(
+                _env_int("postgres_pool_min", MIN_CONNECTIONS),
+                _env_int("postgres_pool_max", MAX_CONNECTIONS),
+                **conninfo,
+            )
+            _pools[key] = pool
+    return pool
+
+
+def _env_int(name: str, default: int) -> int:
+    """Read an integer environment variable, falling back to ``default``."""
+    value = os.getenv(name)
+    if value is None:
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError(f"{name} must be an integer, got {value!r}.") from None
+
+
+def close_pools() -> None:
+    """Close every pooled connection and discard all pools."""
+    with _lock:
+        for pool in _pools.values():
+            if not pool.closed:
+                pool.closeall()
+        _pools.clear()
+
+
+atexit.register(close_pools)
@@ -1,32 +1,151 @@
+import csv
+import io
+from datetime import datetime
+import itertools
+import re
+import weakref
+from contextlib import contextmanager
 import psycopg2
-from typing import Optional, List
+from collections.abc import Generator, Iterable, Iterator
+from typing import Any, Optional, List
 from ...domain import models as models
-from ..base import AbstractRepository
+from ..base import Repository
 from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
-from psycopg2 import errorcodes
+from psycopg2 import errorcodes, sql
+from psycopg2.extras import NamedTupleCursor, execute_values
+from psycopg2.pool import ThreadedConnectionPool
 import os
-from .schema import SCHEMAS
+from .pool import get_pool
+from .schema import SCHEMA_STATEMENTS
 from ...utils import doc_inherit
 
+# Splits of every transaction touching an account, one page of transactions at
+# a time. The page continues after the (date, id) key of the previous one,
+# following the ORDER BY, and a NULL limit means no limit. The rows of one
+# transaction are adjacent, which lets them be grouped while streaming.
+_TRANSACTIONS_BY_ACCOUNT = """WITH tx_ids AS (
+    SELECT DISTINCT transaction_id
+    FROM splits
+    WHERE account_id = {account_id}
+), page AS (
+    SELECT t.id, t.description, t.date
+    FROM transactions t
+    JOIN tx_ids x ON x.transaction_id = t.id
+    WHERE (
+        {after_date}::timestamp IS NULL
+        OR t.date < {after_date}
+        OR (t.date = {after_date} AND t.id > {after_id})
+    )
+    ORDER BY t.date DESC, t.id
+    LIMIT {limit}
+)
+SELECT
+    p.id AS transaction_id,
+    p.description,
+    p.date,
+    s.id AS split_id,
+    s.amount,
+    s.commodity_id,
+    s.account_id
+FROM page p
+JOIN splits s ON p.id = s.transaction_id
+ORDER BY p.date DESC, p.id, s.id;"""
+
+# Every account query selects these columns, in the order _row_to_account
+# takes them, and adds its own WHERE clause.
+_SELECT_ACCOUNTS = """SELECT
+    a.id,
+    a.name,
+    a.type,
+    a.open,
+    a.description,
+    a.commodity_id,
+    c.name AS commodity_name,
+    c.prefix AS commodity_prefix
+FROM accounts a
+LEFT JOIN commodity c ON a.commodity_id = c.id"""
+
+# Hot queries, prepared once per connection and then run with EXECUTE so
+# the server skips parsing and planning on every call. Keyed by statement name.
+PREPARED_STATEMENTS: dict[str, str] = {
+    "ledge_get_commodity": """PREPARE ledge_get_commodity(integer) AS
+SELECT id, name, prefix, description
+FROM commodity WHERE id = $1;""",
+    "ledge_get_account_by_id": "PREPARE ledge_get_account_by_id(integer) AS\n"
+    + _SELECT_ACCOUNTS
+    + "\nWHERE a.id = $1;",
+    "ledge_get_status_by_account": """PREPARE ledge_get_status_by_account(integer) AS
+SELECT id, status, date, account_id
+FROM account_statuses WHERE account_id = $1
+ORDER BY date DESC;""",
+    "ledge_add_transaction": """PREPARE ledge_add_transaction(text, timestamp, integer[], numeric[], integer[]) AS
+WITH new_transaction AS (
+    INSERT INTO transactions (description, date)
+    VALUES ($1, $2)
+    RETURNING id
+), new_splits AS (
+    INSERT INTO splits (account_id, amount, commodity_id, transaction_id)
+    SELECT s.account_id, s.amount, s.commodity_id, t.id
+    FROM new_transaction t,
+        unnest($3::integer[], $4::numeric[], $5::integer[])
+            AS s(account_id, amount, commodity_id)
+)
+SELECT id FROM new_transaction;""",
+    "ledge_get_transactions": "PREPARE ledge_get_transactions"
+    "(integer, timestamp, integer, bigint) AS\n"
+    + _TRANSACTIONS_BY_ACCOUNT.format(
+        account_id="$1", after_date="$2", after_id="$3", limit="$4"
+    ),
+}
+
+# The same statements as plain queries, for connections that must not hold
+# prepared statements (e.g. behind PgBouncer in transaction pooling mode, where
+# consecutive transactions may run on different server sessions). $n
+# placeholders become %(n)s so psycopg2 can fill them in.
+_UNPREPARED_STATEMENTS: dict[str, str] = {
+    name: re.sub(r"\$(\d+)", r"%(\1)s", statement.split(" AS\n", 1)[1])
+    for name, statement in PREPARED_STATEMENTS.items()
+}
+
+# names for server-side cursors, which must be unique per connection
+_stream_ids = itertools.count()
+
+# Prepared statements live as long as the server session, i.e. the pooled
+# connection, not the repository that happened to prepare them.
+_prepared: "weakref.WeakKeyDictionary[psycopg2.extensions.connection, set[str]]" = (
+    weakref.WeakKeyDictionary()
+)
 
-class PostgreSQLRepository(AbstractRepository):
-    """PostgreSQL implementation of the AbstractRepository."""
+
+class PostgreSQLRepository(Repository):
+    """PostgreSQL implementation of the Repository."""
 
     def __init__(self) -> None:
         """Initialize the PostgreSQL repository."""
         self._connection: Optional[psycopg2.extensions.connection] = None
+        self._pool: Optional[ThreadedConnectionPool] = None
+        self._cursor: Optional[psycopg2.extensions.cursor] = None
+        self._use_prepared = True
+        # iter_transactions generators that may still hold a server-side cursor
+        self._streams: "weakref.WeakSet[Generator[models.Transaction, None, None]]" = (
+            weakref.WeakSet()
+        )
+        # commodities rarely change, get_commodities is served from here once loaded
+        self._commodity_cache: dict[models.CommodityID, models.Commodity] | None = None
 
     def open(self) -> None:
-        """Open a connection to the PostgreSQL database."""
+        """Check out a connection to the PostgreSQL database from the shared pool."""
+        self.close()
         conn = None
         try:
-            conn = psycopg2.connect(
+            pool = get_pool(
                 dbname=os.getenv("db_name"),
                 user=os.getenv("postgres_user"),
                 password=os.getenv("postgres_password"),
                 host=os.getenv("postgres_host"),
                 port=os.getenv("postgres_port"),
             )
+            conn = _checkout(pool)
         except psycopg2.Error as e:
             if e.pgcode == errorcodes.INVALID_PASSWORD:
                 raise ConnectionError(
@@ -42,10 +161,23 @@ class PostgreSQLRepository(AbstractRepository):
             ) from e
         if conn is None:
             raise ConnectionError("Failed to connect to the PostgreSQL database.")
+        # rows come back as named tuples, so columns are read by name
+        conn.cursor_factory = NamedTupleCursor
+        # set postgres_prepared_statements=0 when a transaction pooler sits in front
+        self._use_prepared = os.getenv("postgres_prepared_statements", "1") != "0"
         self._connection = conn
+        self._pool = pool
+        # one cursor serves every query on this connection
+        self._cursor = conn.cursor()
 
     def create(self) -> None:
-        """Create the PostgreSQL database using necessary schemas."""
+        """Create the PostgreSQL database using necessary schemas.
+
+        If the ``db_template`` environment variable names an existing database
+        that already holds the schema, the new database is cloned from it
+        instead of running the schema statements.
+        """
+        template = os.getenv("db_template")
         conn = None
         try:
             conn = psycopg2.connect(
@@ -57,7 +189,15 @@ class PostgreSQLRepository(AbstractRepository):
             )
             conn.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
             cursor = conn.cursor()
-            cursor.execute(f"CREATE DATABASE {os.getenv('db_name')};")
+            db_name = sql.Identifier(os.getenv("db_name", ""))
+            if template:
+                cursor.execute(
+                    sql.SQL("CREATE DATABASE {} TEMPLATE {};").format(
+                        db_name, sql.Identifier(template)
+                    )
+                )
+            else:
+                cursor.execute(sql.SQL("CREATE DATABASE {};").format(db_name))
         except psycopg2.Error as e:
             if e.pgcode == errorcodes.INVALID_PASSWORD:
                 raise ConnectionError(
@@ -72,16 +212,29 @@ class PostgreSQLRepository(AbstractRepository):
             if conn:
                 conn.close()
         self.open()
-        assert self._connection is not None
-        cursor = self._connection.cursor()
-        cursor.execute(SCHEMAS)
-        self._connection.commit()
+        if template:
+            return
+        with self.transaction():
+            cursor = self.cursor
+            for statement in SCHEMA_STATEMENTS:
+                cursor.execute(statement)
 
     def close(self) -> None:
-        """Close the connection to the PostgreSQL database."""
+        """Return the connection to the pool, or close it if the pool is gone."""
+        # finish unfinished streams first, their cursors are on this connection
+        for stream in list(self._streams):
+            stream.close()
+        if self._cursor is not None:
+            self._cursor.close()
+            self._cursor = None
         if self._connection:
-            self._connection.close()
+            if self._pool is not None and not self._pool.closed:
+                self._pool.putconn(self._connection)
+            else:
+                self._connection.close()
             self._connection = None
+            self._pool = None
+        self._commodity_cache = None
 
     @property
     def connection(self) -> psycopg2.extensions.connection:
@@ -90,24 +243,82 @@ class PostgreSQLRepository(AbstractRepository):
             raise ConnectionError("Database connection is not open.")
         return self._connection
 
+    @property
+    def cursor(self) -> psycopg2.extensions.cursor:
+        """Get the cursor shared by all queries on the current connection."""
+        if self._cursor is None:
+            raise ConnectionError("Database connection is not open.")
+        return self._cursor
+
+    @contextmanager
+    def transaction(self) -> Iterator[None]:
+        """Run the enclosed statements in a single transaction.
+
+        The connection is in autocommit mode otherwise. The transaction is
+        committed when the block exits normally and rolled back if it raises.
+        Nested uses join the outermost transaction, so the bulk methods can be
+        called inside one.
+        """
+        connection = self.connection
+        if not connection.autocommit:
+            yield
+            return
+        connection.autocommit = False
+        try:
+            yield
+            connection.commit()
+        except BaseException:
+            connection.rollback()
+            raise
+        finally:
+            connection.autocommit = True
+
+    def _execute_prepared(
+        self, cursor: psycopg2.extensions.cursor, name: str, *params: object
+    ) -> None:
+        """Run one of the ``PREPARED_STATEMENTS``, preparing it on first use.
+
+        With ``postgres_prepared_statements=0`` the statement is sent as a
+        plain query instead, and nothing is prepared on the connection.
+
+        Args:
+            cursor (psycopg2.extensions.cursor): Cursor of the current connection.
+            name (str): Key of the statement in ``PREPARED_STATEMENTS``.
+            *params (object): Values for the statement's parameters.
+        """
+        if not self._use_prepared:
+            cursor.execute(
+                _UNPREPARED_STATEMENTS[name],
+                {str(i): param for i, param in enumerate(params, start=1)},
+            )
+            return
+        prepared = _prepared.setdefault(self.connection, set())
+        if name not in prepared:
+            cursor.execute(PREPARED_STATEMENTS[name])
+            prepared.add(name)
+        placeholders = ", ".join(["%s"] * len(params))
+        cursor.execute(f"EXECUTE {name}({placeholders});", params)
+
     @doc_inherit
     def add_commodity(self, commodity: models.CommodityCreate) -> models.Commodity:
         query = """INSERT INTO commodity (name, prefix, description)
                    VALUES (%s, %s, %s) RETURNING id;"""
-        cursor = self.connection.cursor()
+        cursor = self.cursor
         cursor.execute(query, (commodity.name, commodity.prefix, commodity.description))
         commodity_id = cursor.fetchone()
         if commodity_id is None:
             raise RuntimeError(
                 "Failed to retrieve the ID of the newly inserted commodity."
             )
-        self.connection.commit()
-        return models.Commodity(
+        new_commodity = models.Commodity(
             id=commodity_id[0],
             name=commodity.name,
             prefix=commodity.prefix,
             description=commodity.description,
         )
+        if self._commodity_cache is not None:
+            self._commodity_cache[new_commodity.id] = new_commodity
+        return new_commodity
 
     @doc_inherit
     def get_commodity(
@@ -115,48 +326,61 @@ class PostgreSQLRepository(AbstractRepository):
     ) -> models.Commodity | None:
         """Retrieve a commodity by its ID."""
 
-        query = """SELECT id, name, prefix, description
-                   FROM commodity WHERE id = %s;"""
-        cursor = self.connection.cursor()
-        cursor.execute(query, (commodity_id,))
-        row = cursor.fetchone()
+        # the commodity table is small, so the first lookup loads all of it
+        cache = self._commodity_cache
+        if cache is None:
+            self.get_commodities()
+            cache = self._commodity_cache
+            assert cache is not None
+        commodity = cache.get(commodity_id)
+        if commodity is not None:
+            return commodity
+        # it may have been added through another connection since the cache was loaded
+        cursor = self.cursor
+        self._execute_prepared(cursor, "ledge_get_commodity", commodity_id)
+        row: Any = cursor.fetchone()
         if row is None:
             return None
-        return models.Commodity(
-            id=row[0], name=row[1], prefix=row[2], description=row[3]
-        )
+        commodity = models.Commodity(**row._asdict())
+        cache[commodity.id] = commodity
+        return commodity
 
     @doc_inherit
     def get_commodities(self) -> list[models.Commodity]:
+        if self._commodity_cache is not None:
+            return list(self._commodity_cache.values())
         query = """SELECT id, name, prefix, description
                    FROM commodity;"""
-        cursor = self.connection.cursor()
+        cursor = self.cursor
         cursor.execute(query)
-        rows = cursor.fetchall()
-        if not rows:
-            return []
-        return [
-            models.Commodity(id=row[0], name=row[1], prefix=row[2], description=row[3])
-            for row in rows
-        ]
+        rows: list[Any] = cursor.fetchall()
+        self._commodity_cache = {
+            row.id: models.Commodity(**row._asdict()) for row in rows
+        }
+        return list(self._commodity_cache.values())
 
     @doc_inherit
     def open_account(self, account: models.AccountCreate) -> models.Account:
-        status_insert = """INSERT INTO account_statuses (status, date, account_id)
-                     VALUES (%s, %s, %s);"""
-
-        account_insert = """INSERT INTO accounts (name, type, open, commodity_id, description)
-                     VALUES (%s, %s, %s, %s, %s) RETURNING id;"""
-        cursor = self.connection.cursor()
-
+        # the account and its opening status are written in one statement
+        query = """WITH new_account AS (
+    INSERT INTO accounts (name, type, open, commodity_id, description)
+    VALUES (%s, %s, %s, %s, %s)
+    RETURNING id
+)
+INSERT INTO account_statuses (status, date, account_id)
+SELECT %s, %s, id FROM new_account
+RETURNING account_id;"""
+        cursor = self.cursor
         cursor.execute(
-            account_insert,
+            query,
             (
                 account.name,
                 account.type,
                 True,
                 account.commodity.id if account.commodity else None,
                 account.description,
+                models.AccountStatusEnum.open,
+                account.open_date,
             ),
         )
         account_id = cursor.fetchone()
@@ -165,11 +389,6 @@ class PostgreSQLRepository(AbstractRepository):
                 "Failed to retrieve the ID of the newly inserted account."
             )
         account_id_val = account_id[0]
-        cursor.execute(
-            status_insert,
-            (models.AccountStatusEnum.open, account.open_date, account_id_val),
-        )
-        self.connection.commit()
 
         return models.Account(
             id=account_id_val,
@@ -181,179 +400,233 @@ class PostgreSQLRepository(AbstractRepository):
         )
 
     @doc_inherit
-    def get_accounts(self) -> List[models.Account]:
+    def open_accounts(
+        self, accounts: list[models.AccountCreate]
+    ) -> list[models.Account]:
+        if not accounts:
+            return []
+        with self.transaction():
+            cursor = self.cursor
+            # reserve the ids up front so the statuses can reference them
+            cursor.execute(
+                """SELECT nextval(pg_get_serial_sequence('accounts', 'id'))
+                   FROM generate_series(1, %s);""",
+                (len(accounts),),
+            )
+            account_ids = [row[0] for row in cursor.fetchall()]
+
+            execute_values(
+                cursor,
+                """INSERT INTO accounts (id, name, type, open, commodity_id, description)
+                   VALUES %s;""",
+                [
+                    (
+                        account_id,
+                        account.name,
+                        account.type,
+                        True,
+                        account.commodity.id if account.commodity else None,
+                        account.description,
+                    )
+                    for account_id, account in zip(account_ids, accounts)
+                ],
+                page_size=500,
+            )
+            execute_values(
+                cursor,
+                "INSERT INTO account_statuses (status, date, account_id) VALUES %s;",
+                [
+                    (models.AccountStatusEnum.open, account.open_date, account_id)
+                    for account_id, account in zip(account_ids, accounts)
+                ],
+                page_size=500,
+            )
+        return [
+            models.Account(
+                id=account_id,
+                name=account.name,
+                type=account.type,
+                open=True,
+                commodity=account.commodity,
+                description=account.description,
+            )
+            for account_id, account in zip(account_ids, accounts)
+        ]
+
+    @doc_inherit
+    def get_accounts(
+        self, after: models.AccountID | None = None, limit: int | None = None
+    ) -> List[models.Account]:
         """Retrieve all accounts from the database, including their associated commodities."""
 
         # get commodity info as well
-        query = """SELECT
-    a.id,
-    a.name,
-    a.type,
-    a.open,
-    a.description,
-    a.commodity_id,
-    c.name AS commodity_name,
-    c.prefix AS commodity_prefix
-FROM accounts a
-LEFT JOIN commodity c ON a.commodity_id = c.id;"""
-        cursor = self.connection.cursor()
+        query = (
+            _SELECT_ACCOUNTS
+            + """
+WHERE %(after)s::integer IS NULL OR a.id > %(after)s
+ORDER BY a.id
+LIMIT %(limit)s;"""
+        )
+        cursor = self.cursor
+        cursor.execute(query, {"after": after, "limit": limit})
+        return list(itertools.starmap(_row_to_account, cursor.fetchall()))
+
+    @doc_inherit
+    def get_accounts_and_commodities(
+        self,
+    ) -> tuple[list[models.Account], list[models.Commodity]]:
+        # both lists come back as JSON in one round trip, accounts as objects
+        # keyed by the _SELECT_ACCOUNTS column names
+        query = f"""SELECT
+    (SELECT coalesce(json_agg(account), '[]')
+    FROM ({_SELECT_ACCOUNTS}) account) AS accounts,
+    (SELECT coalesce(json_agg(json_build_array(id, name, prefix, description)), '[]')
+    FROM commodity) AS commodities;"""
+        cursor = self.cursor
         cursor.execute(query)
-        rows = cursor.fetchall()
-        accounts = []
-        for row in rows:
-            accounts.append(
-                models.Account(
-                    id=row[0],
-                    name=row[1],
-                    type=row[2],
-                    open=row[3],
-                    description=row[4],
-                    commodity=models.Commodity(
-                        id=row[5], name=row[6], prefix=row[7], description=None
-                    )
-                    if row[5] is not None
-                    else None,
-                )
+        result = cursor.fetchone()
+        if result is None:
+            raise RuntimeError("Failed to retrieve accounts and commodities.")
+        account_rows, commodity_rows = result
+        accounts = [_row_to_account(**row) for row in account_rows]
+        self._commodity_cache = {
+            row[0]: models.Commodity(
+                id=row[0], name=row[1], prefix=row[2], description=row[3]
             )
-        return accounts
+            for row in commodity_rows
+        }
+        return accounts, list(self._commodity_cache.values())
 
     @doc_inherit
     def get_account_by_id(self, account_id: models.AccountID) -> models.Account | None:
-        query = """SELECT
-    a.id,
-    a.name,
-    a.type,
-    a.open,
-    a.description,
-    a.commodity_id,
-    c.name AS commodity_name,
-    c.prefix AS commodity_prefix
-FROM accounts a
-LEFT JOIN commodity c ON a.commodity_id = c.id
-WHERE a.id = %s;"""
-        cursor = self.connection.cursor()
-        cursor.execute(query, (account_id,))
-        row = cursor.fetchone()
+        cursor = self.cursor
+        self._execute_prepared(cursor, "ledge_get_account_by_id", account_id)
+        row: Any = cursor.fetchone()
         if row is None:
             return None
-        return models.Account(
-            id=row[0],
-            name=row[1],
-            type=row[2],
-            open=row[3],
-            description=row[4],
-            commodity=models.Commodity(
-                id=row[5], name=row[6], prefix=row[7], description=None
-            )
-            if row[5] is not None
-            else None,
-        )
+        return _row_to_account(*row)
 
     @doc_inherit
     def set_account_status(self, status: models.AccountStatus) -> models.AccountStatus:
         query = """INSERT INTO account_statuses (status, date, account_id)
                    VALUES (%s, %s, %s);"""
-        cursor = self.connection.cursor()
+        cursor = self.cursor
         cursor.execute(query, (status.status, status.date, status.account_id))
-        self.connection.commit()
         return status
 
+    @doc_inherit
+    def set_account_statuses(
+        self, statuses: list[models.AccountStatus]
+    ) -> list[models.AccountStatus]:
+        query = "INSERT INTO account_statuses (status, date, account_id) VALUES %s;"
+        # one multi-row INSERT per page instead of a statement per status
+        with self.transaction():
+            execute_values(
+                self.cursor,
+                query,
+                [
+                    (status.status, status.date, status.account_id)
+                    for status in statuses
+                ],
+                page_size=500,
+            )
+        return statuses
+
     @doc_inherit
     def get_status_by_account(
         self, account_id: models.AccountID
     ) -> List[models.AccountStatus]:
-        query = """SELECT id, status, date, account_id
-                   FROM account_statuses WHERE account_id = %s
-                   ORDER BY date DESC;"""
-        cursor = self.connection.cursor()
-        cursor.execute(query, (account_id,))
-        rows = cursor.fetchall()
-        statuses = []
-        for row in rows:
-            statuses.append(
-                models.AccountStatus(status=row[1], date=row[2], account_id=row[3])
-            )
-        return statuses
+        cursor = self.cursor
+        self._execute_prepared(cursor, "ledge_get_status_by_account", account_id)
+        return list(itertools.starmap(_row_to_status, cursor.fetchall()))
 
     @doc_inherit
     def get_transactions(
-        self, account_id: models.AccountID
+        self,
+        account_id: models.AccountID,
+        after: tuple[datetime, models.TransactionID] | None = None,
+        limit: int | None = None,
     ) -> List[models.Transaction]:
-        query = """SELECT
-    t.id AS transaction_id,
-    t.description,
-    t.date,
-    s.id AS split_id,
-    s.amount,
-    s.commodity_id,
-    s.account_id
-FROM transactions t
-JOIN splits s ON t.id = s.transaction_id
-WHERE t.id IN (
-    SELECT DISTINCT transaction_id
-    FROM splits
-    WHERE account_id = %s
-)
-ORDER BY t.date DESC, t.id, s.id;"""
-        cursor = self.connection.cursor()
-        cursor.execute(query, (account_id,))
-        rows = cursor.fetchall()
-
-        # Group splits by transaction
-        transactions_dict: dict[int, models.Transaction] = {}
-        for row in rows:
-            txn_id = row[0]
-            if txn_id not in transactions_dict:
-                transactions_dict[txn_id] = models.Transaction(
-                    id=txn_id, description=row[1], date=row[2], splits=[]
-                )
-            transactions_dict[txn_id].splits.append(
-                models.Split(
-                    amount=row[4],
-                    commodity_id=row[5],
-                    account_id=row[6],
-                    transaction_id=txn_id,
-                )
-            )
+        after_date, after_id = after if after is not None else (None, None)
+        cursor = self.cursor
+        self._execute_prepared(
+            cursor, "ledge_get_transactions", account_id, after_date, after_id, limit
+        )
+        return list(_group_transactions(cursor.fetchall()))
+
+    @doc_inherit
+    def iter_transactions(
+        self, account_id: models.AccountID
+    ) -> Iterator[models.Transaction]:
+        stream = self._stream_transactions(account_id)
+        self._streams.add(stream)
+        return stream
+
+    def _stream_transactions(
+        self, account_id: models.AccountID
+    ) -> Generator[models.Transaction, None, None]:
+        """Generator behind ``iter_transactions``.
+
+        Args:
+            account_id (models.AccountID): The ID of the account.
 
-        return list(transactions_dict.values())
+        Yields:
+            models.Transaction: The account's transactions.
+        """
+        # a named cursor keeps the result on the server and fetches it in
+        # batches; WITH HOLD lets it outlive the transaction that declared it,
+        # so it works in autocommit and survives other commits on the connection
+        with self.connection.cursor(
+            name=f"ledge_stream_{next(_stream_ids)}", withhold=True
+        ) as cursor:
+            cursor.itersize = 1000
+            cursor.execute(
+                _TRANSACTIONS_BY_ACCOUNT.format(
+                    account_id="%(account_id)s",
+                    after_date="%(after_date)s",
+                    after_id="%(after_id)s",
+                    limit="%(limit)s",
+                ),
+                {
+                    "account_id": account_id,
+                    "after_date": None,
+                    "after_id": None,
+                    "limit": None,
+                },
+            )
+            yield from _group_transactions(cursor)
 
     @doc_inherit
     def add_transaction(
         self, transaction: models.TransactionCreate
     ) -> models.Transaction:
-        query = """INSERT INTO transactions (description, date)
-                     VALUES (%s, %s) RETURNING id;"""
-        cursor = self.connection.cursor()
-        cursor.execute(query, (transaction.description, transaction.date))
+        # the transaction and all of its splits are written in one statement,
+        # which is atomic on its own and needs a single round trip
+        cursor = self.cursor
+        self._execute_prepared(
+            cursor,
+            "ledge_add_transaction",
+            transaction.description,
+            transaction.date,
+            [split.account_id for split in transaction.splits],
+            [split.amount for split in transaction.splits],
+            [split.commodity_id for split in transaction.splits],
+        )
         transaction_id = cursor.fetchone()
         if transaction_id is None:
             raise RuntimeError(
                 "Failed to retrieve the ID of the newly inserted transaction."
             )
         transaction_id_val = transaction_id[0]
-        new_splits = []
-        for split in transaction.splits:
-            split_query = """INSERT INTO splits (account_id, amount, commodity_id, transaction_id)
-                             VALUES (%s, %s, %s, %s);"""
-            cursor.execute(
-                split_query,
-                (
-                    split.account_id,
-                    split.amount,
-                    split.commodity_id,
-                    transaction_id_val,
-                ),
-            )
-            new_splits.append(
-                models.Split(
-                    amount=split.amount,
-                    commodity_id=split.commodity_id,
-                    account_id=split.account_id,
-                    transaction_id=transaction_id_val,
-                )
+        new_splits = [
+            models.Split(
+                amount=split.amount,
+                commodity_id=split.commodity_id,
+                account_id=split.account_id,
+                transaction_id=transaction_id_val,
             )
-        self.connection.commit()
+            for split in transaction.splits
+        ]
         return models.Transaction(
             id=transaction_id_val,
             description=transaction.description,
@@ -361,37 +634,198 @@ ORDER BY t.date DESC, t.id, s.id;"""
             splits=new_splits,
         )
 
+    @doc_inherit
+    def add_transactions(
+        self, transactions: list[models.TransactionCreate]
+    ) -> list[models.Transaction]:
+        if not transactions:
+            return []
+        with self.transaction():
+            cursor = self.cursor
+            # reserve the ids up front so the splits can reference them in the same COPY
+            cursor.execute(
+                """SELECT nextval(pg_get_serial_sequence('transactions', 'id'))
+                   FROM generate_series(1, %s);""",
+                (len(transactions),),
+            )
+            transaction_ids = [row[0] for row in cursor.fetchall()]
+
+            new_transactions = [
+                models.Transaction(
+                    id=transaction_id,
+                    description=transaction.description,
+                    date=transaction.date,
+                    splits=[
+                        models.Split(
+                            amount=split.amount,
+                            commodity_id=split.commodity_id,
+                            account_id=split.account_id,
+                            transaction_id=transaction_id,
+                        )
+                        for split in transaction.splits
+                    ],
+                )
+                for transaction_id, transaction in zip(transaction_ids, transactions)
+            ]
+
+            # QUOTE_NONNUMERIC quotes every string, so an empty description is
+            # loaded as an empty string rather than as COPY's unquoted NULL
+            transactions_csv = io.StringIO()
+            csv.writer(transactions_csv, quoting=csv.QUOTE_NONNUMERIC).writerows(
+                (txn.id, txn.date.isoformat(), txn.description)
+                for txn in new_transactions
+            )
+            splits_csv = io.StringIO()
+            csv.writer(splits_csv, quoting=csv.QUOTE_NONNUMERIC).writerows(
+                (
+                    split.account_id,
+                    split.amount,
+                    split.commodity_id,
+                    split.transaction_id,
+                )
+                for txn in new_transactions
+                for split in txn.splits
+            )
+            transactions_csv.seek(0)
+            splits_csv.seek(0)
+            cursor.copy_expert(
+                "COPY transactions (id, date, description) FROM STDIN WITH (FORMAT csv);",
+                transactions_csv,
+            )
+            cursor.copy_expert(
+                """COPY splits (account_id, amount, commodity_id, transaction_id)
+                   FROM STDIN WITH (FORMAT csv);""",
+                splits_csv,
+            )
+        return new_transactions
+
     @doc_inherit
     def get_account_by_name(self, account_name: str) -> List[models.Account]:
-        query = """SELECT
-    a.id,
-    a.name,
-    a.type,
-    a.open,
-    a.description,
-    a.commodity_id,
-    c.name AS commodity_name,
-    c.prefix AS commodity_prefix
-FROM accounts a
-LEFT JOIN commodity c ON a.commodity_id = c.id
-WHERE a.name ILIKE %s;"""
-        cursor = self.connection.cursor()
+        query = _SELECT_ACCOUNTS + "\nWHERE a.name ILIKE %s;"
+        cursor = self.cursor
         cursor.execute(query, (f"%{account_name}%",))
-        rows = cursor.fetchall()
-        accounts = []
-        for row in rows:
-            accounts.append(
-                models.Account(
-                    id=row[0],
-                    name=row[1],
-                    type=row[2],
-                    open=row[3],
-                    description=row[4],
-                    commodity=models.Commodity(
-                        id=row[5], name=row[6], prefix=row[7], description=None
-                    )
-                    if row[5] is not None
-                    else None,
-                )
+        return list(itertools.starmap(_row_to_account, cursor.fetchall()))
+
+
+# connections _checkout has handed out before, which may have gone stale idle
+_checked_out: "weakref.WeakSet[psycopg2.extensions.connection]" = weakref.WeakSet()
+
+
+def _checkout(
+    pool: ThreadedConnectionPool,
+) -> Optional[psycopg2.extensions.connection]:
+    """Take a live connection from ``pool``, discarding any the server dropped.
+
+    psycopg2 only notices a connection is gone once an operation on it fails,
+    so an idle pooled connection that the server closed (restart, idle timeout)
+    looks healthy until it is used. Connections handed out before are pinged
+    when reused, and dead ones are closed and replaced, up to one attempt per
+    pool slot. A connection the pool has just opened is returned unpinged.
+
+    Returns:
+        Optional[psycopg2.extensions.connection]: A live connection in
+            autocommit mode, or None if the pool handed out none.
+
+    Raises:
+        psycopg2.Error: If no live connection could be obtained.
+    """
+    attempts_left = pool.maxconn + 1
+    while True:
+        conn = pool.getconn()
+        if conn is None:
+            return None
+        # single statements commit on their own, multi-statement work uses
+        # transaction()
+        conn.autocommit = True
+        if conn not in _checked_out:
+            _checked_out.add(conn)
+            return conn
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1;")
+            return conn
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            pool.putconn(conn, close=True)
+            attempts_left -= 1
+            if not attempts_left:
+                raise
+
+
+def _row_to_account(
+    id: models.AccountID,
+    name: str,
+    type: models.AccountTypeEnum,
+    open: bool,
+    description: str | None,
+    commodity_id: models.CommodityID | None,
+    commodity_name: Any,
+    commodity_prefix: Any,
+) -> models.Account:
+    """Build an account from a row of the account queries.
+
+    The parameters mirror the ``_SELECT_ACCOUNTS`` columns, so rows can be
+    mapped with ``itertools.starmap`` and JSON objects unpacked by name. The
+    commodity columns come from a LEFT JOIN and are all NULL when the account
+    has no commodity. The commodity's description is not selected, so the
+    nested ``Commodity`` always has ``description=None``.
+    """
+    return models.Account(
+        id=id,
+        name=name,
+        type=type,
+        open=open,
+        description=description,
+        commodity=models.Commodity(
+            id=commodity_id,
+            name=commodity_name,
+            prefix=commodity_prefix,
+            description=None,
+        )
+        if commodity_id is not None
+        else None,
+    )
+
+
+def _row_to_status(
+    id: int,
+    status: models.AccountStatusEnum,
+    date: datetime,
+    account_id: models.AccountID,
+) -> models.AccountStatus:
+    """Build an account status from a ``get_status_by_account`` row."""
+    return models.AccountStatus(status=status, date=date, account_id=account_id)
+
+
+def _group_transactions(
+    rows: Iterable[Any],
+) -> Iterator[models.Transaction]:
+    """Group ``_TRANSACTIONS_BY_ACCOUNT`` rows into transactions.
+
+    Each transaction is yielded as soon as its last split has been read, so
+    only one transaction is held in memory at a time.
+
+    Args:
+        rows (Iterable[Any]): Named tuple rows, ordered by transaction.
+
+    Yields:
+        models.Transaction: The transactions in query order.
+    """
+    transaction: models.Transaction | None = None
+    for row in rows:
+        txn_id = row.transaction_id
+        if transaction is None or transaction.id != txn_id:
+            if transaction is not None:
+                yield transaction
+            transaction = models.Transaction(
+                id=txn_id, description=row.description, date=row.date, splits=[]
             )
-        return accounts
+        transaction.splits.append(
+            models.Split(
+                amount=row.amount,
+                commodity_id=row.commodity_id,
+                account_id=row.account_id,
+                transaction_id=txn_id,
+            )
+        )
+    if transaction is not None:
+        yield transaction
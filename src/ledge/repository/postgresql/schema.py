@@ -1,52 +1,65 @@
-SCHEMAS = """CREATE TYPE account_status_enum AS ENUM (
+# One entry per statement, so create() can run them one by one and a failure
+# points at the statement that caused it.
+SCHEMA_STATEMENTS: tuple[str, ...] = (
+    """CREATE TYPE account_status_enum AS ENUM (
     'open',
     'close'
-);
-CREATE TYPE account_type_enum AS ENUM (
+);""",
+    """CREATE TYPE account_type_enum AS ENUM (
     'asset',
     'liability',
     'equity',
     'income',
     'expense'
-);
-
-CREATE TABLE commodity (
+);""",
+    """CREATE TABLE commodity (
     id SERIAL PRIMARY KEY,
     name VARCHAR(255) NOT NULL,
     prefix boolean NOT NULL,
     description TEXT
-);
-CREATE TABLE accounts (
+);""",
+    """CREATE TABLE accounts (
     id SERIAL PRIMARY KEY,
     name VARCHAR(255) NOT NULL,
     description TEXT,
     type account_type_enum NOT NULL,
     open boolean NOT NULL DEFAULT TRUE,
     commodity_id INTEGER REFERENCES commodity(id)
-);
-CREATE TABLE account_statuses (
+);""",
+    """CREATE TABLE account_statuses (
     id SERIAL PRIMARY KEY,
     status account_status_enum NOT NULL,
     date TIMESTAMP WITHOUT TIME ZONE NOT NULL,
     account_id INTEGER NOT NULL REFERENCES accounts(id)
-);
-CREATE INDEX idx_account_status_account_id ON account_statuses(account_id);
-
-CREATE TABLE transactions (
+);""",
+    """CREATE INDEX idx_account_status_account_id ON account_statuses(account_id);""",
+    # trigram index for the unanchored ILIKE in get_account_by_name, skipped on
+    # servers that don't ship the pg_trgm contrib extension
+    """DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm') THEN
+        CREATE EXTENSION IF NOT EXISTS pg_trgm;
+        CREATE INDEX idx_accounts_name_trgm ON accounts USING gin (name gin_trgm_ops);
+    END IF;
+END
+$$;""",
+    """CREATE TABLE transactions (
     id SERIAL PRIMARY KEY,
     date TIMESTAMP WITHOUT TIME ZONE NOT NULL,
     description TEXT
-);
-CREATE TABLE splits (
+);""",
+    """CREATE TABLE splits (
     id SERIAL PRIMARY KEY,
     amount NUMERIC NOT NULL,
 
     commodity_id INTEGER NOT NULL REFERENCES commodity(id),
     account_id INTEGER NOT NULL REFERENCES accounts(id),
     transaction_id INTEGER NOT NULL REFERENCES transactions(id)
-);
-
-CREATE INDEX idx_splits_account_id ON splits(account_id);
-CREATE INDEX idx_splits_transaction_id ON splits(transaction_id);
-CREATE INDEX idx_splits_commodity_id ON splits(commodity_id);
-CREATE INDEX idx_transactions_date ON transactions(date);"""
+);""",
+    # covering indexes, so get_transactions reads splits without touching the heap
+    """CREATE INDEX idx_splits_account_txn ON splits(account_id, transaction_id);""",
+    """CREATE INDEX idx_splits_txn_covering ON splits(transaction_id)
+    INCLUDE (id, account_id, amount, commodity_id);""",
+    """CREATE INDEX idx_splits_commodity_id ON splits(commodity_id);""",
+    """CREATE INDEX idx_transactions_date_id ON transactions(date DESC, id);""",
+)
@@ -19,6 +19,21 @@ class DocInherit:
         self.mthd = mthd
         self.name = mthd.__name__
 
+    def __set_name__(self, owner: type[Any], name: str) -> None:
+        """Copy the parent docstring once and put the plain method on the class.
+
+        This runs when the decorated method's class is created, so the parent
+        lookup happens once instead of on every attribute access, and calls go
+        straight to the function. ``__get__`` is only used when the descriptor
+        is attached to a class after its creation.
+        """
+        overridden: Callable[..., Any] | None = None
+        for parent in owner.__mro__[1:]:
+            overridden = getattr(parent, name, None)
+            if overridden:
+                break
+        setattr(owner, name, self._use_parent_doc(self.mthd, overridden))
+
     @overload
     def __get__(self, obj: None, cls: type[Any]) -> Callable[..., Any]: ...
     @overload
@@ -0,0 +1,43 @@
+from decimal import Decimal
+
+import pytest
+from ledge.cli.transaction import parse_amount
+from ledge.domain import models
+
+USD = models.Commodity(
+    id=models.CommodityID(1), name="USD", prefix=False, description=None
+)
+COMMODITY_MAP = {"USD": USD}
+
+
+@pytest.mark.parametrize(
+    "amount_str, expected",
+    [
+        ("50 USD", Decimal("50")),
+        ("-10 usd", Decimal("-10")),
+        ("USD 2.50", Decimal("2.50")),
+        ("+3 USD", Decimal("3")),
+    ],
+)
+def test_parse_amount(amount_str, expected):
+    assert parse_amount(amount_str, COMMODITY_MAP) == (expected, USD.id)
+
+
+@pytest.mark.parametrize(
+    "amount_str",
+    [
+        "1E2 USD",
+        "1_000 USD",
+        "NaN USD",
+        "Infinity USD",
+        "10. USD",
+        ".5 USD",
+        "+-5 USD",
+        "١٢ USD",
+        "50 CAD",
+        "50USD",
+        "50 USD extra",
+    ],
+)
+def test_parse_amount_rejects(amount_str):
+    assert parse_amount(amount_str, COMMODITY_MAP) is None
@@ -1,53 +1,168 @@
 from datetime import datetime
 from decimal import Decimal
-import uuid
+import secrets
 import pytest
 import psycopg2
+from psycopg2 import sql
 import os
 from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
 from ledge.domain import models
 from ledge.repository.postgresql.repo import PostgreSQLRepository
+from ledge.repository.postgresql.pool import close_pools
 
 # Mark all tests in this module with 'psql_integration' marker
 pytestmark = pytest.mark.integration
 
 
-@pytest.fixture
-def temp_db_config(monkeypatch):
-    """Set environment variables for a temporary test database name."""
-    random_db_name = f"test_db_{uuid.uuid4().hex[:8]}"
+@pytest.fixture(scope="session")
+def admin_conn():
+    """
+    One autocommit connection to the default ``postgres`` database for the
+    whole session, used to drop the test databases.
+    """
+    # We need to pull the ADMIN credentials from os.getenv manually here
+    conn = psycopg2.connect(
+        dbname="postgres",
+        user=os.getenv("postgres_user"),
+        password=os.getenv("postgres_password"),
+        host=os.getenv("postgres_host"),
+        port=os.getenv("postgres_port"),
+    )
+    conn.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
+    yield conn
+    conn.close()
 
-    monkeypatch.setenv("db_name", random_db_name)
 
-    return random_db_name
+def _drop_database(admin_conn, name):
+    """Disconnect every session from ``name`` and drop it."""
+    # Pooled connections keep the DB busy, release them before dropping it
+    close_pools()
+
+    try:
+        with admin_conn.cursor() as cursor:
+            if admin_conn.server_version >= 130000:
+                # FORCE terminates the remaining sessions as part of the drop
+                cursor.execute(
+                    sql.SQL("DROP DATABASE IF EXISTS {} WITH (FORCE);").format(
+                        sql.Identifier(name)
+                    )
+                )
+            else:
+                cursor.execute(
+                    "SELECT pg_terminate_backend(pid) FROM pg_stat_activity "
+                    "WHERE datname = %s AND pid <> pg_backend_pid();",
+                    (name,),
+                )
+                cursor.execute(
+                    sql.SQL("DROP DATABASE IF EXISTS {};").format(sql.Identifier(name))
+                )
+    except Exception as e:
+        print(f"Warning: Failed to clean up test DB {name}: {e}")
+
+
+@pytest.fixture(scope="session")
+def ledge_template_db(admin_conn, worker_id):
+    """
+    Build the schema once per session into a template DB.
+
+    Each test DB is then cloned from it with CREATE DATABASE ... TEMPLATE,
+    which is a file copy instead of a run of every schema statement.
+    Under pytest-xdist every worker builds its own template, as a template
+    cannot be cloned by two sessions at once.
+    """
+    template_name = f"ledge_template_{worker_id}_{secrets.token_hex(4)}"
+
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setenv("db_name", template_name)
+        mp.delenv("db_template", raising=False)
+        repo = PostgreSQLRepository()
+        repo.create()
+        repo.close()
+
+    # A template cannot be cloned while anything is connected to it
+    close_pools()
+
+    yield template_name
+
+    _drop_database(admin_conn, template_name)
+
+
+@pytest.fixture(scope="session")
+def ledge_test_db(admin_conn, worker_id, ledge_template_db):
+    """
+    Create the DB shared by every test of this session (or xdist worker).
+
+    Tests leave it empty again through cleanup_db, so the catalog work of
+    creating and dropping a database is paid once per session.
+    """
+    db_name = f"ledge_test_{worker_id}_{secrets.token_hex(4)}"
+
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setenv("db_name", db_name)
+        mp.setenv("db_template", ledge_template_db)
+        repo = PostgreSQLRepository()
+        repo.create()
+        repo.close()
+
+    yield db_name
+
+    _drop_database(admin_conn, db_name)
+
+
+@pytest.fixture
+def temp_db_config(monkeypatch, ledge_test_db):
+    """Point the repository at the session's shared test database."""
+    monkeypatch.setenv("db_name", ledge_test_db)
+
+    return ledge_test_db
 
 
 @pytest.fixture
 def cleanup_db(temp_db_config):
     """
-    Fixture to ensure the test DB is deleted after the test, even if the test fails.
+    Fixture to ensure the test DB is emptied after the test, even if the test fails.
     """
     yield  # Run the test
 
-    # Connect to postgres default DB and drop the temp DB
-    # We need to pull the ADMIN credentials from os.getenv manually here
+    # RESTART IDENTITY so every test sees IDs starting from 1 again
+    repo = PostgreSQLRepository()
+    repo.open()
     try:
-        conn = psycopg2.connect(
-            dbname="postgres",
-            user=os.getenv("postgres_user"),
-            password=os.getenv("postgres_password"),
-            host=os.getenv("postgres_host"),
-            port=os.getenv("postgres_port"),
+        repo.cursor.execute(
+            "TRUNCATE commodity, accounts, account_statuses, transactions, splits "
+            "RESTART IDENTITY CASCADE;"
         )
-        conn.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
-        with conn.cursor() as cursor:
-            cursor.execute(f"DROP DATABASE IF EXISTS {temp_db_config};")
-        conn.close()
-    except Exception as e:
-        print(f"Warning: Failed to clean up test DB {temp_db_config}: {e}")
+    finally:
+        repo.close()
 
 
-def test_lifecycle_create_and_open(temp_db_config, cleanup_db):
+@pytest.fixture
+def repo(temp_db_config, cleanup_db):
+    """An open repository on the shared test database, closed after the test."""
+    repo = PostgreSQLRepository()
+    repo.open()
+    yield repo
+    repo.close()
+
+
+@pytest.fixture
+def fresh_db_config(monkeypatch, admin_conn, worker_id, ledge_template_db):
+    """
+    Set environment variables for a new database, for tests of create() itself.
+
+    The database is cloned from the template and dropped after the test.
+    """
+    random_db_name = f"test_db_{worker_id}_{secrets.token_hex(4)}"
+
+    monkeypatch.setenv("db_name", random_db_name)
+    monkeypatch.setenv("db_template", ledge_template_db)
+
+    yield random_db_name
+
+    _drop_database(admin_conn, random_db_name)
+
+
+def test_lifecycle_create_and_open(fresh_db_config):
     """
     1. Create a brand new random DB.
     2. Verify we can open a connection to it.
@@ -69,37 +184,60 @@ def test_lifecycle_create_and_open(temp_db_config, cleanup_db):
         assert repo._connection is None
 
 
-def test_add_commodity(temp_db_config, cleanup_db):
+def test_account_name_trigram_index(repo):
+    """
+    Test that account names get a trigram index where pg_trgm is available.
+    1. Skip unless the server ships the pg_trgm extension.
+    2. Verify pg_indexes lists the GIN trigram index on accounts.name.
+    """
+    with repo.connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm';")
+        if cursor.fetchone() is None:
+            pytest.skip("pg_trgm is not available on this server")
+        cursor.execute(
+            "SELECT indexdef FROM pg_indexes "
+            "WHERE tablename = 'accounts' AND indexname = 'idx_accounts_name_trgm';"
+        )
+        row = cursor.fetchone()
+
+    assert row is not None
+    assert "gin (name gin_trgm_ops)" in row.indexdef
+
+
+def test_add_commodity(repo):
     """
     Test adding a commodity to the PostgreSQLRepository.
     1. Add a commodity.
     2. Verify the commodity was added correctly.
+    3. Verify a commodity added through another repository is found as well.
     """
+    new_commodity = models.CommodityCreate(
+        name="USD", prefix=True, description="US Dollar"
+    )
+    commodity = repo.add_commodity(new_commodity)
+    assert commodity.id is not None
+    assert commodity.name == new_commodity.name
+    assert commodity.prefix == new_commodity.prefix
+    assert commodity.description == new_commodity.description
+
+    retrieved_commodity = repo.get_commodity(commodity.id)
+    assert retrieved_commodity is not None
+    assert retrieved_commodity.id == commodity.id
+    assert retrieved_commodity.name == commodity.name
+    assert retrieved_commodity.prefix == commodity.prefix
+    assert retrieved_commodity.description == commodity.description
+
+    # a commodity added by another repository after the cache was loaded
+    other = PostgreSQLRepository()
+    other.open()
     try:
-        repo = PostgreSQLRepository()
-        repo.create()
-
-        new_commodity = models.CommodityCreate(
-            name="USD", prefix=True, description="US Dollar"
-        )
-        commodity = repo.add_commodity(new_commodity)
-        assert commodity.id is not None
-        assert commodity.name == new_commodity.name
-        assert commodity.prefix == new_commodity.prefix
-        assert commodity.description == new_commodity.description
-
-        retrieved_commodity = repo.get_commodity(commodity.id)
-        assert retrieved_commodity is not None
-        assert retrieved_commodity.id == commodity.id
-        assert retrieved_commodity.name == commodity.name
-        assert retrieved_commodity.prefix == commodity.prefix
-        assert retrieved_commodity.description == commodity.description
+        added = create_commodity(other, name="EUR")
     finally:
-        repo.close()
-        assert repo._connection is None
+        other.close()
+    assert repo.get_commodity(added.id) == added
 
 
-def test_get_commodities(temp_db_config, cleanup_db):
+def test_get_commodities(repo):
     """
     Test get_commodities returns empty list when no commodities exist.
     1. Verify empty list on new DB.
@@ -108,54 +246,45 @@ def test_get_commodities(temp_db_config, cleanup_db):
     4. Verify attributes of returned commodities.
     5. Verify IDs are unique.
     """
-    try:
-        repo = PostgreSQLRepository()
-        repo.create()
+    commodities = repo.get_commodities()
+    assert commodities == []
 
-        commodities = repo.get_commodities()
-        assert commodities == []
-
-        new_commodity = models.CommodityCreate(
-            name="USD", prefix=True, description="US Dollar"
-        )
-        added = repo.add_commodity(new_commodity)
-
-        commodities = repo.get_commodities()
-        assert len(commodities) == 1
-        assert commodities[0].id == added.id
-        assert commodities[0].name == "USD"
-        assert commodities[0].prefix is True
-        assert commodities[0].description == "US Dollar"
-
-        commodities_to_add = [
-            models.CommodityCreate(
-                name="CAD", prefix=False, description="Canadian Dollar"
-            ),
-            models.CommodityCreate(name="BTC", prefix=False),
-            models.CommodityCreate(name="$", prefix=True),
-        ]
-        added_ids = [added.id]
-        for c in commodities_to_add:
-            added = repo.add_commodity(c)
-            added_ids.append(added.id)
-
-        commodities = repo.get_commodities()
-        assert len(commodities) == 4
+    new_commodity = models.CommodityCreate(
+        name="USD", prefix=True, description="US Dollar"
+    )
+    added = repo.add_commodity(new_commodity)
+
+    commodities = repo.get_commodities()
+    assert len(commodities) == 1
+    assert commodities[0].id == added.id
+    assert commodities[0].name == "USD"
+    assert commodities[0].prefix is True
+    assert commodities[0].description == "US Dollar"
+
+    commodities_to_add = [
+        models.CommodityCreate(name="CAD", prefix=False, description="Canadian Dollar"),
+        models.CommodityCreate(name="BTC", prefix=False),
+        models.CommodityCreate(name="$", prefix=True),
+    ]
+    added_ids = [added.id]
+    for c in commodities_to_add:
+        added = repo.add_commodity(c)
+        added_ids.append(added.id)
 
-        names = {c.name for c in commodities}
-        assert names == {"USD", "CAD", "BTC", "$"}
+    commodities = repo.get_commodities()
+    assert len(commodities) == 4
 
-        descriptions = {c.description for c in commodities}
-        assert descriptions == {"US Dollar", "Canadian Dollar", None}
+    names = {c.name for c in commodities}
+    assert names == {"USD", "CAD", "BTC", "$"}
 
-        prefixes = {c.prefix for c in commodities}
-        assert prefixes == {True, False}
+    descriptions = {c.description for c in commodities}
+    assert descriptions == {"US Dollar", "Canadian Dollar", None}
 
-        for c in commodities:
-            assert c.id in added_ids
+    prefixes = {c.prefix for c in commodities}
+    assert prefixes == {True, False}
 
-    finally:
-        repo.close()
+    for c in commodities:
+        assert c.id in added_ids
 
 
 def create_commodity(repo, name="USD", prefix=True, description="US Dollar"):
@@ -169,7 +298,7 @@ def create_commodity(repo, name="USD", prefix=True, description="US Dollar"):
     return repo.add_commodity(new_commodity)
 
 
-def test_add_account(temp_db_config, cleanup_db):
+def test_add_account(repo):
     """
     Test adding an account to the PostgreSQLRepository.
     1. Add a commodity.
@@ -178,55 +307,60 @@ def test_add_account(temp_db_config, cleanup_db):
     4. Verify the initial account status was added correctly.
     5. Add an account without a linked commodity
     """
-    try:
-        repo = PostgreSQLRepository()
-        repo.create()
+    # Add a commodity first (required foreign key)
+    new_commodity = models.CommodityCreate(
+        name="USD", prefix=True, description="US Dollar"
+    )
+    commodity = repo.add_commodity(new_commodity)
 
-        # Add a commodity first (required foreign key)
-        new_commodity = models.CommodityCreate(
-            name="USD", prefix=True, description="US Dollar"
-        )
-        commodity = repo.add_commodity(new_commodity)
-
-        # Now add an account
-        new_account = models.AccountCreate(
-            name="assets:cash",
-            type=models.AccountTypeEnum.asset,
-            open=True,
-            commodity=commodity,
-            open_date=datetime.now(),
-        )
-        account = repo.open_account(new_account)
-        assert account.id is not None
-        assert account.name == new_account.name
-        assert account.type == new_account.type
-        assert account.open == new_account.open
-        assert account.commodity is not None
-        assert account.commodity.id == commodity.id
-
-        status = repo.get_status_by_account(account.id)
-        assert status is not None
-        assert status[0].status == models.AccountStatusEnum.open
-        assert len(status) == 1
-
-        # Add an account without a linked commodity
-        new_account_no_commodity = models.AccountCreate(
-            name="expenses:food",
-            type=models.AccountTypeEnum.expense,
-            open=True,
-            commodity=None,
-            open_date=datetime.now(),
-        )
-        account_no_commodity = repo.open_account(new_account_no_commodity)
-        assert account_no_commodity.id is not None
-        assert account_no_commodity.name == new_account_no_commodity.name
-        assert account_no_commodity.type == new_account_no_commodity.type
-        assert account_no_commodity.open == new_account_no_commodity.open
-        assert account_no_commodity.commodity is None
+    # Now add an account
+    new_account = models.AccountCreate(
+        name="assets:cash",
+        type=models.AccountTypeEnum.asset,
+        open=True,
+        commodity=commodity,
+        open_date=datetime.now(),
+    )
+    account = repo.open_account(new_account)
+    assert account.id is not None
+    assert account.name == new_account.name
+    assert account.type == new_account.type
+    assert account.open == new_account.open
+    assert account.commodity is not None
+    assert account.commodity.id == commodity.id
+
+    status = repo.get_status_by_account(account.id)
+    assert status is not None
+    assert status[0].status == models.AccountStatusEnum.open
+    assert len(status) == 1
+
+    # Add an account without a linked commodity
+    new_account_no_commodity = models.AccountCreate(
+        name="expenses:food",
+        type=models.AccountTypeEnum.expense,
+        open=True,
+        commodity=None,
+        open_date=datetime.now(),
+    )
+    account_no_commodity = repo.open_account(new_account_no_commodity)
+    assert account_no_commodity.id is not None
+    assert account_no_commodity.name == new_account_no_commodity.name
+    assert account_no_commodity.type == new_account_no_commodity.type
+    assert account_no_commodity.open == new_account_no_commodity.open
+    assert account_no_commodity.commodity is None
 
-    finally:
-        repo.close()
-        assert repo._connection is None
+
+def account_create(
+    name="assets:bank", account_type=models.AccountTypeEnum.asset, commodity=None
+):
+    """Helper function to build an account to open."""
+    return models.AccountCreate(
+        name=name,
+        type=account_type,
+        open=True,
+        commodity=commodity,
+        open_date=datetime.now(),
+    )
 
 
 def create_test_account(
@@ -236,154 +370,192 @@ def create_test_account(
     Helper function to create a test account.
     After verifying account creation works in test_add_account.
     """
-    new_account = models.AccountCreate(
-        name=name,
-        type=account_type,
-        open=True,
-        commodity=commodity,
-        open_date=datetime.now(),
-    )
-    return repo.open_account(new_account)
+    return repo.open_account(account_create(name, account_type, commodity))
 
 
-def test_get_accounts_various(temp_db_config, cleanup_db):
+def test_get_accounts_various(repo):
     """
     Test retrieving accounts from the PostgreSQLRepository.
     1. Add multiple accounts.
     2. Retrieve all accounts and verify they match what was added.
     3. Retrieve accounts by name substring and verify results.
     """
-    try:
-        repo = PostgreSQLRepository()
-        repo.create()
+    # Add multiple accounts in one go
+    added = repo.open_accounts(
+        [
+            account_create("assets:bank:checking"),
+            account_create("assets:bank:savings"),
+            account_create(
+                "liabilities:credit_card",
+                account_type=models.AccountTypeEnum.liability,
+            ),
+        ]
+    )
+    assert [acc.name for acc in added] == [
+        "assets:bank:checking",
+        "assets:bank:savings",
+        "liabilities:credit_card",
+    ]
+    for account in added:
+        assert repo.get_account_by_id(account.id) == account
+        assert [s.status for s in repo.get_status_by_account(account.id)] == [
+            models.AccountStatusEnum.open
+        ]
 
-        # Add multiple accounts
-        create_test_account(repo, name="assets:bank:checking")
-        create_test_account(repo, name="assets:bank:savings")
-        create_test_account(
-            repo,
-            name="liabilities:credit_card",
-            account_type=models.AccountTypeEnum.liability,
-        )
+    # Retrieve all accounts
+    accounts = repo.get_accounts()
+    assert len(accounts) == 3
+    account_names = {acc.name for acc in accounts}
+    assert "assets:bank:checking" in account_names
+    assert "assets:bank:savings" in account_names
+    assert "liabilities:credit_card" in account_names
 
-        # Retrieve all accounts
-        accounts = repo.get_accounts()
-        assert len(accounts) == 3
-        account_names = {acc.name for acc in accounts}
-        assert "assets:bank:checking" in account_names
-        assert "assets:bank:savings" in account_names
-        assert "liabilities:credit_card" in account_names
-
-        # Retrieve accounts by name substring
-        bank_accounts = repo.get_account_by_name("bank")
-        assert len(bank_accounts) == 2
-        bank_account_names = {acc.name for acc in bank_accounts}
-        assert "assets:bank:checking" in bank_account_names
-        assert "assets:bank:savings" in bank_account_names
+    # Retrieve accounts by name substring
+    bank_accounts = repo.get_account_by_name("bank")
+    assert len(bank_accounts) == 2
+    bank_account_names = {acc.name for acc in bank_accounts}
+    assert "assets:bank:checking" in bank_account_names
+    assert "assets:bank:savings" in bank_account_names
 
-    finally:
-        repo.close()
-        assert repo._connection is None
 
-
-def test_add_account_status(temp_db_config, cleanup_db):
+def test_get_accounts_and_commodities(repo):
+    """
+    Test retrieving accounts and commodities together.
+    1. Verify both lists are empty on a new DB.
+    2. Add a commodity and accounts with and without it.
+    3. Verify both lists match what was added.
+    """
+    assert repo.get_accounts_and_commodities() == ([], [])
+
+    commodity = create_commodity(repo)
+    create_test_account(repo, name="assets:bank:checking", commodity=commodity)
+    create_test_account(repo, name="expenses:food")
+
+    accounts, commodities = repo.get_accounts_and_commodities()
+    assert commodities == [commodity]
+    assert {acc.name for acc in accounts} == {
+        "assets:bank:checking",
+        "expenses:food",
+    }
+    for acc in accounts:
+        if acc.name == "assets:bank:checking":
+            assert acc.commodity is not None
+            assert acc.commodity.id == commodity.id
+            assert acc.commodity.name == commodity.name
+        else:
+            assert acc.commodity is None
+        assert acc.type == models.AccountTypeEnum.asset
+        assert acc.open is True
+
+
+def test_add_account_status(repo):
     """
     Test adding account status entries to the PostgreSQLRepository.
     1. Add an account.
     2. Add multiple status entries for that account.
     3. Verify the status entries were added correctly.
     """
-    try:
-        repo = PostgreSQLRepository()
-        repo.create()
-
-        # Add an account first
+    # Add an account and its status entries, committed together
+    with repo.transaction():
         account = create_test_account(repo)
-
-        # Add status entries
-        status_open = repo.set_account_status(
-            models.AccountStatus(
-                account_id=account.id,
-                status=models.AccountStatusEnum.open,
-                date=datetime(2024, 1, 1),
-            )
+        status_open, status_close = repo.set_account_statuses(
+            [
+                models.AccountStatus(
+                    account_id=account.id,
+                    status=models.AccountStatusEnum.open,
+                    date=datetime(2024, 1, 1),
+                ),
+                models.AccountStatus(
+                    account_id=account.id,
+                    status=models.AccountStatusEnum.close,
+                    date=datetime(2024, 6, 1),
+                ),
+            ]
         )
-        status_close = repo.set_account_status(
-            models.AccountStatus(
-                account_id=account.id,
-                status=models.AccountStatusEnum.close,
-                date=datetime(2024, 6, 1),
-            )
+    assert status_open is not None
+    assert status_close is not None
+
+    assert status_open.account_id == account.id
+    assert status_open.status == models.AccountStatusEnum.open
+    assert status_open.date == datetime(2024, 1, 1)
+
+    assert status_close.account_id == account.id
+    assert status_close.status == models.AccountStatusEnum.close
+    assert status_close.date == datetime(2024, 6, 1)
+
+    # Verify all statuses for the account
+    statuses = repo.get_status_by_account(account.id)
+    # including the initial open status from account creation
+    assert len(statuses) == 3
+
+    # bulk backfill
+    backfill = [
+        models.AccountStatus(
+            account_id=account.id,
+            status=models.AccountStatusEnum.open
+            if month % 2
+            else models.AccountStatusEnum.close,
+            date=datetime(2023, month, 1),
         )
-        assert status_open is not None
-        assert status_close is not None
-
-        assert status_open.account_id == account.id
-        assert status_open.status == models.AccountStatusEnum.open
-        assert status_open.date == datetime(2024, 1, 1)
-
-        assert status_close.account_id == account.id
-        assert status_close.status == models.AccountStatusEnum.close
-        assert status_close.date == datetime(2024, 6, 1)
-
-        # Verify all statuses for the account
-        statuses = repo.get_status_by_account(account.id)
-        # including the initial open status from account creation
-        assert len(statuses) == 3
-    finally:
-        repo.close()
-        assert repo._connection is None
+        for month in range(1, 13)
+    ]
+    assert repo.set_account_statuses(backfill) == backfill
+    statuses = repo.get_status_by_account(account.id)
+    assert len(statuses) == 15
+    assert statuses[-1].date == datetime(2023, 1, 1)
+    assert statuses[-1].status == models.AccountStatusEnum.open
+
+    # a single status on its own
+    reopen = models.AccountStatus(
+        account_id=account.id,
+        status=models.AccountStatusEnum.open,
+        date=datetime(2024, 7, 1),
+    )
+    assert repo.set_account_status(reopen) == reopen
+    assert repo.get_status_by_account(account.id)[1] == reopen
 
 
-def test_get_account_by_id(temp_db_config, cleanup_db):
+def test_get_account_by_id(repo):
     """
     Test retrieving an account by ID from the PostgreSQLRepository.
     1. Add an account.
     2. Retrieve the account by its ID.
     3. Verify the retrieved account matches the added account.
     """
-    try:
-        repo = PostgreSQLRepository()
-        repo.create()
-
-        # Add an account first
-        account_added = create_test_account(
-            repo,
-            name="liabilities:credit_card",
-            account_type=models.AccountTypeEnum.liability,
-        )
-
-        # Retrieve by ID
-        account_retrieved = repo.get_account_by_id(account_added.id)
-        assert account_retrieved is not None
-        assert account_retrieved.id == account_added.id
-        assert account_retrieved.name == account_added.name
-        assert account_retrieved.type == account_added.type
-        assert account_retrieved.open == account_added.open
-
-        account_not_found = repo.get_account_by_id(models.AccountID(9999))
-        assert account_not_found is None
-    finally:
-        repo.close()
-        assert repo._connection is None
-
+    # Add an account first
+    account_added = create_test_account(
+        repo,
+        name="liabilities:credit_card",
+        account_type=models.AccountTypeEnum.liability,
+    )
 
-def test_get_commodity_not_found(temp_db_config, cleanup_db):
+    # Retrieve by ID
+    account_retrieved = repo.get_account_by_id(account_added.id)
+    assert account_retrieved is not None
+    assert account_retrieved.id == account_added.id
+    assert account_retrieved.name == account_added.name
+    assert account_retrieved.type == account_added.type
+    assert account_retrieved.open == account_added.open
+
+
+@pytest.mark.parametrize(
+    ("method", "key", "expected"),
+    [
+        ("get_commodity", models.CommodityID(9999), None),
+        ("get_account_by_id", models.AccountID(9999), None),
+        ("get_account_by_name", "no such account", []),
+        ("get_status_by_account", models.AccountID(9999), []),
+        ("get_transactions", models.AccountID(9999), []),
+    ],
+)
+def test_get_not_found(repo, method, key, expected):
     """
-    Test retrieving a non-existent commodity from the PostgreSQLRepository.
-    1. Attempt to retrieve a commodity with a random ID.
-    2. Verify that None is returned.
+    Test that look-ups for missing rows come back empty.
+    1. Add a commodity and an account, so the tables are not empty.
+    2. Look up a row that does not exist and verify None or [] is returned.
     """
-    try:
-        repo = PostgreSQLRepository()
-        repo.create()
-
-        non_existent_id = models.CommodityID(9999)
-        commodity = repo.get_commodity(non_existent_id)
-        assert commodity is None
-    finally:
-        repo.close()
-        assert repo._connection is None
+    create_test_account(repo, commodity=create_commodity(repo))
+    assert getattr(repo, method)(key) == expected
 
 
 def create_simple_transaction(
@@ -438,7 +610,7 @@ def create_complex_transaction(
     return txn
 
 
-def test_get_transactions(temp_db_config, cleanup_db):
+def test_get_transactions(repo):
     """
     Test retrieving transactions for an account from the PostgreSQLRepository.
     1. Add operating commodity
@@ -446,17 +618,18 @@ def test_get_transactions(temp_db_config, cleanup_db):
     3. Add multiple transactions for those accounts.
     4. Retrieve the transactions and verify they match what was added.
     """
-    try:
-        repo = PostgreSQLRepository()
-        repo.create()
-
+    with repo.transaction():
         # add commodity
         create_commodity(repo)
 
         # Add an account first
-        account1 = create_test_account(repo, name="assets:checking")
-        account2 = create_test_account(repo, name="expense:groceries")
-        account3 = create_test_account(repo, name="liabilities:credit_card")
+        account1, account2, account3 = repo.open_accounts(
+            [
+                account_create("assets:checking"),
+                account_create("expense:groceries"),
+                account_create("liabilities:credit_card"),
+            ]
+        )
 
         # Add transactions
         transaction1 = create_simple_transaction(
@@ -468,26 +641,302 @@ def test_get_transactions(temp_db_config, cleanup_db):
         transaction3 = create_simple_transaction(
             account3.id, account2.id, "bought groceries with credit card"
         )
-        repo.add_transaction(transaction1)
-        repo.add_transaction(transaction2)
-        repo.add_transaction(transaction3)
-
-        # Retrieve transactions
-        transactions_checking = repo.get_transactions(account1.id)
-        assert len(transactions_checking) == 2
-        transactions_groceries = repo.get_transactions(account2.id)
-        assert len(transactions_groceries) == 3
-        transactions_credit_card = repo.get_transactions(account3.id)
-        assert len(transactions_credit_card) == 1
-
-        # Verify transaction details
-        for txn in transactions_checking:
-            assert txn.description in ["bought groceries", "bought more groceries"]
-            assert len(txn.splits) == 2
-            split_amounts = [split.amount for split in txn.splits]
-            assert Decimal("-150.0") in split_amounts
-            assert Decimal("150.0") in split_amounts
+        repo.add_transactions([transaction1, transaction2, transaction3])
+
+    # Retrieve transactions
+    transactions_checking = repo.get_transactions(account1.id)
+    assert len(transactions_checking) == 2
+    transactions_groceries = repo.get_transactions(account2.id)
+    assert len(transactions_groceries) == 3
+    transactions_credit_card = repo.get_transactions(account3.id)
+    assert len(transactions_credit_card) == 1
+
+    # streaming yields the same transactions in the same order
+    for account in (account1, account2, account3):
+        assert list(repo.iter_transactions(account.id)) == repo.get_transactions(
+            account.id
+        )
 
-    finally:
+    # Verify transaction details
+    for txn in transactions_checking:
+        assert txn.description in ["bought groceries", "bought more groceries"]
+        assert len(txn.splits) == 2
+        split_amounts = [split.amount for split in txn.splits]
+        assert Decimal("-150.0") in split_amounts
+        assert Decimal("150.0") in split_amounts
+
+
+def test_iter_transactions_stopped_early(repo, monkeypatch):
+    """
+    Test that abandoning a stream leaves the connection usable.
+    1. Break out of a stream early, then write; verify the write is committed.
+    2. Write while streaming, then break; verify that write is committed too.
+    3. Close the repository mid-stream; verify the stream is finished and the
+       pooled connection is handed back idle.
+    """
+    # keep two idle connections, so the pool does not close the one handed back
+    monkeypatch.setenv("postgres_pool_min", "2")
+    close_pools()
+    repo.open()
+
+    create_commodity(repo)
+    account, other = repo.open_accounts(
+        [account_create("assets:checking"), account_create("expense:groceries")]
+    )
+    repo.add_transactions(
+        [
+            create_simple_transaction(account.id, other.id, f"groceries {i}")
+            for i in range(3)
+        ]
+    )
+
+    def committed_count():
+        reader = PostgreSQLRepository()
+        reader.open()
+        try:
+            return len(reader.get_transactions(account.id))
+        finally:
+            reader.close()
+
+    for _ in repo.iter_transactions(account.id):
+        break
+    assert repo.connection.autocommit
+    repo.add_transaction(create_simple_transaction(account.id, other.id, "after"))
+    assert committed_count() == 4
+
+    for _ in repo.iter_transactions(account.id):
+        repo.add_transaction(create_simple_transaction(account.id, other.id, "during"))
+        break
+    assert repo.connection.autocommit
+    assert committed_count() == 5
+
+    stream = repo.iter_transactions(account.id)
+    next(stream)
+    connection = repo.connection
+    repo.close()
+    assert next(stream, None) is None
+    assert connection.autocommit
+    assert (
+        connection.info.transaction_status
+        == psycopg2.extensions.TRANSACTION_STATUS_IDLE
+    )
+    repo.open()
+
+
+def test_iter_transactions_interleaved(repo):
+    """
+    Test that streams do not break each other or transaction blocks.
+    1. Consume two streams together and verify both yield everything.
+    2. Start a stream inside a transaction block, finish it after the block
+       commits, and verify it yields everything.
+    """
+    create_commodity(repo)
+    account, other = repo.open_accounts(
+        [account_create("assets:checking"), account_create("expense:groceries")]
+    )
+    repo.add_transactions(
+        [
+            create_simple_transaction(account.id, other.id, f"groceries {i}")
+            for i in range(3)
+        ]
+    )
+    expected = repo.get_transactions(account.id)
+
+    pairs = list(
+        zip(repo.iter_transactions(account.id), repo.iter_transactions(other.id))
+    )
+    assert [first for first, _ in pairs] == expected
+    assert [second for _, second in pairs] == repo.get_transactions(other.id)
+
+    with repo.transaction():
+        stream = repo.iter_transactions(account.id)
+        first = next(stream)
+    assert [first, *stream] == expected
+
+
+def test_open_replaces_dropped_connection(repo, admin_conn):
+    """
+    Test that a pooled connection killed by the server is not handed out.
+    1. Return a connection to the pool and terminate its server session.
+    2. Verify the next open() gets a working connection.
+    """
+    pid = repo.connection.info.backend_pid
+    repo.close()
+    with admin_conn.cursor() as cursor:
+        cursor.execute("SELECT pg_terminate_backend(%s, 5000);", (pid,))
+
+    repo.open()
+    assert repo.connection.info.backend_pid != pid
+    assert repo.get_accounts() == []
+
+
+def test_add_transactions(repo):
+    """
+    Test bulk adding transactions to the PostgreSQLRepository.
+    1. Add operating commodity and accounts.
+    2. Bulk add transactions, including awkward descriptions.
+    3. Verify the returned and stored transactions match, and the ID sequence moved on.
+    """
+    create_commodity(repo)
+    account1 = create_test_account(repo, name="assets:checking")
+    account2 = create_test_account(repo, name="expense:groceries")
+
+    descriptions = ["bought groceries", 'quoted "eggs", milk', "multi\nline", ""]
+    added = repo.add_transactions(
+        [
+            create_simple_transaction(account1.id, account2.id, description)
+            for description in descriptions
+        ]
+    )
+    assert [txn.description for txn in added] == descriptions
+    assert len({txn.id for txn in added}) == len(descriptions)
+
+    stored = {txn.id: txn for txn in repo.get_transactions(account1.id)}
+    assert len(stored) == len(descriptions)
+    for txn in added:
+        assert stored[txn.id].description == txn.description
+        assert stored[txn.id].date == txn.date
+        assert sorted(split.amount for split in stored[txn.id].splits) == [
+            Decimal("-150.0"),
+            Decimal("150.0"),
+        ]
+
+    assert repo.add_transactions([]) == []
+    single = repo.add_transaction(
+        create_simple_transaction(account1.id, account2.id, "after bulk")
+    )
+    assert single.id > max(txn.id for txn in added)
+
+
+def test_prepared_statements_reused(repo):
+    """
+    Test that hot queries are prepared once per pooled connection.
+    1. Run the same writes and lookups twice, across two repositories sharing
+       the connection.
+    2. Verify each statement was prepared only once on the server session.
+    """
+    # start from server sessions that earlier tests have not prepared anything on
+    close_pools()
+    repo.open()
+
+    commodity = create_commodity(repo)
+    account = create_test_account(repo, commodity=commodity)
+    other = create_test_account(repo, name="expenses:food")
+    for added in (1, 2):
+        repo.add_transaction(
+            create_simple_transaction(account.id, other.id, "groceries")
+        )
+        assert repo.get_commodity(commodity.id) == commodity
+        # cache misses go to the database
+        assert repo.get_commodity(models.CommodityID(commodity.id + 1)) is None
+        assert repo.get_account_by_id(account.id).name == account.name
+        assert len(repo.get_status_by_account(account.id)) == 1
+        assert len(repo.get_transactions(account.id)) == added
         repo.close()
-        assert repo._connection is None
+        repo.open()
+
+    with repo.connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT name FROM pg_prepared_statements WHERE name LIKE 'ledge_%%';"
+        )
+        names = sorted(row[0] for row in cursor.fetchall())
+    assert names == [
+        "ledge_add_transaction",
+        "ledge_get_account_by_id",
+        "ledge_get_commodity",
+        "ledge_get_status_by_account",
+        "ledge_get_transactions",
+    ]
+
+
+def test_prepared_statements_disabled(repo, monkeypatch):
+    """
+    Test that postgres_prepared_statements=0 runs the hot reads unprepared.
+    1. Run the lookups with prepared statements switched off.
+    2. Verify they return the usual results and nothing was prepared.
+    """
+    monkeypatch.setenv("postgres_prepared_statements", "0")
+    # start from server sessions that earlier tests have not prepared anything on
+    close_pools()
+    repo.open()
+
+    commodity = create_commodity(repo)
+    account = create_test_account(repo, commodity=commodity)
+    other = create_test_account(repo, name="expenses:food")
+    added = repo.add_transaction(
+        create_simple_transaction(account.id, other.id, "groceries")
+    )
+    assert repo.get_commodity(models.CommodityID(commodity.id + 1)) is None
+    assert repo.get_account_by_id(account.id).name == account.name
+    assert len(repo.get_status_by_account(account.id)) == 1
+    assert repo.get_transactions(account.id) == [added]
+    assert repo.get_transactions(account.id, limit=1) == [added]
+    assert repo.get_transactions(account.id, after=(added.date, added.id)) == []
+
+    with repo.connection.cursor() as cursor:
+        cursor.execute("SELECT count(*) FROM pg_prepared_statements;")
+        assert cursor.fetchone()[0] == 0
+
+
+def test_pagination(repo):
+    """
+    Test keyset pagination of accounts and transactions.
+    1. Add accounts and transactions spread over several dates.
+    2. Page through both and verify the pages join up to the full listing.
+    """
+    with repo.transaction():
+        create_commodity(repo)
+        accounts = [create_test_account(repo, name=f"assets:{i}") for i in range(5)]
+        for day in (3, 1, 2, 2, 1):
+            transaction = create_simple_transaction(
+                accounts[0].id, accounts[1].id, f"day {day}"
+            )
+            transaction.date = datetime(2024, 3, day)
+            repo.add_transaction(transaction)
+
+    first = repo.get_accounts(limit=2)
+    second = repo.get_accounts(after=first[-1].id, limit=2)
+    rest = repo.get_accounts(after=second[-1].id)
+    assert [a.id for a in first + second + rest] == [a.id for a in accounts]
+
+    everything = repo.get_transactions(accounts[0].id)
+    assert [txn.date.day for txn in everything] == [3, 2, 2, 1, 1]
+    pages = []
+    after = None
+    while page := repo.get_transactions(accounts[0].id, after=after, limit=2):
+        assert len(page) <= 2
+        assert all(len(txn.splits) == 2 for txn in page)
+        pages.extend(page)
+        after = (page[-1].date, page[-1].id)
+    assert pages == everything
+
+
+def test_add_transaction_rolls_back_on_error(repo):
+    """
+    Test that a failing add_transaction leaves nothing behind.
+    1. Add a transaction with a split on a missing account.
+    2. Verify no transaction row was kept and the repository is still usable.
+    3. Verify a failing repo.transaction() block discards its earlier writes too.
+    """
+    create_commodity(repo)
+    account = create_test_account(repo)
+    bad = create_simple_transaction(
+        account.id, models.AccountID(account.id + 1000), "bad"
+    )
+    with pytest.raises(psycopg2.errors.ForeignKeyViolation):
+        repo.add_transaction(bad)
+
+    with repo.connection.cursor() as cursor:
+        cursor.execute("SELECT count(*) FROM transactions;")
+        assert cursor.fetchone()[0] == 0
+    assert repo.get_transactions(account.id) == []
+
+    # an error inside repo.transaction() discards every write in the block
+    with pytest.raises(psycopg2.errors.ForeignKeyViolation):
+        with repo.transaction():
+            repo.add_transaction(
+                create_simple_transaction(account.id, account.id, "good")
+            )
+            repo.add_transaction(bad)
+    assert repo.get_transactions(account.id) == []
+    assert repo.connection.autocommit
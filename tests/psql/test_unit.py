@@ -1,30 +1,48 @@
 import psycopg2
 import pytest
 from ledge.repository.postgresql import PostgreSQLRepository
-from psycopg2 import errorcodes
-from ledge.repository.postgresql.schema import SCHEMAS
+from ledge.repository.postgresql.pool import close_pools
+from psycopg2 import errorcodes, sql
+from ledge.repository.postgresql.schema import SCHEMA_STATEMENTS
 
 
-def error_factory(message: str, pg_code: str):
-    """Helper to create a psycopg2.Error with a specific pgcode."""
+class MockError(psycopg2.OperationalError):
+    """A psycopg2.Error with a specific pgcode."""
 
-    class MockError(psycopg2.OperationalError):
-        # needed to make factory because pgcode is read-only
-        pgcode: str = pg_code
+    def __init__(self, msg: str, pg_code: str):
+        super().__init__(msg)
+        self._pg_code = pg_code
 
-        def __init__(self, msg: str):
-            super().__init__(msg)
+    @property
+    def pgcode(self) -> str:
+        # a property because pgcode is read-only on psycopg2.Error
+        return self._pg_code
 
-    return MockError(message)
 
+# built once, the tests only ever raise them
+_AUTH_ERR = MockError("Fatal error...", errorcodes.INVALID_PASSWORD)
+_NO_DB_ERR = MockError("Database does not exist", errorcodes.INVALID_CATALOG_NAME)
+_DUP_DB_ERR = MockError("Database already exists", errorcodes.DUPLICATE_DATABASE)
 
-@pytest.fixture
-def mock_env(monkeypatch):
-    monkeypatch.setenv("db_name", "test_db")
-    monkeypatch.setenv("postgres_user", "user")
-    monkeypatch.setenv("postgres_password", "pass")
-    monkeypatch.setenv("postgres_host", "localhost")
-    monkeypatch.setenv("postgres_port", "5432")
+
+@pytest.fixture(autouse=True)
+def reset_pools():
+    """Pools are process-wide, make sure mocked connections don't leak between tests."""
+    yield
+    close_pools()
+
+
+@pytest.fixture(scope="module")
+def mock_env():
+    # module scope: the values never change, and they must not leak into the
+    # integration tests that run in the same session
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setenv("db_name", "test_db")
+        mp.setenv("postgres_user", "user")
+        mp.setenv("postgres_password", "pass")
+        mp.setenv("postgres_host", "localhost")
+        mp.setenv("postgres_port", "5432")
+        yield
 
 
 def test_open_success(mocker, mock_env):
@@ -50,8 +68,7 @@ def test_open_auth_failure(mocker, mock_env):
 
     mock_connect = mocker.patch("psycopg2.connect")
     # insert error with INVALID_PASSWORD code
-    error = error_factory("Fatal error...", errorcodes.INVALID_PASSWORD)
-    mock_connect.side_effect = error
+    mock_connect.side_effect = _AUTH_ERR
     repo = PostgreSQLRepository()
 
     with pytest.raises(ConnectionError, match="Authentication failed"):
@@ -86,8 +103,7 @@ def test_open_db_not_exist(mocker, mock_env):
 
     mock_connect = mocker.patch("psycopg2.connect")
     # insert error with INVALID_CATALOG_NAME code
-    error = error_factory("Database does not exist", errorcodes.INVALID_CATALOG_NAME)
-    mock_connect.side_effect = error
+    mock_connect.side_effect = _NO_DB_ERR
     repo = PostgreSQLRepository()
 
     with pytest.raises(ConnectionError, match="Database does not exist"):
@@ -105,6 +121,7 @@ def test_create_success(mocker, mock_env):
 
     # Second connection (to new db for schema setup via open())
     mock_db_conn = mocker.MagicMock()
+    mock_db_conn.closed = 0
     mock_db_cursor = mock_db_conn.cursor.return_value
 
     mock_connect.side_effect = [mock_admin_conn, mock_db_conn]
@@ -123,7 +140,9 @@ def test_create_success(mocker, mock_env):
     mock_admin_conn.set_isolation_level.assert_called_with(
         psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT
     )
-    mock_admin_cursor.execute.assert_called_with("CREATE DATABASE test_db;")
+    mock_admin_cursor.execute.assert_called_with(
+        sql.SQL("CREATE DATABASE {};").format(sql.Identifier("test_db"))
+    )
     mock_admin_conn.close.assert_called_once()  # Verify finally block closes connection
 
     # Verify second connection via open() for schema setup
@@ -134,19 +153,43 @@ def test_create_success(mocker, mock_env):
         host="localhost",
         port="5432",
     )
-    mock_db_cursor.execute.assert_called_with(SCHEMAS)
+    assert mock_db_cursor.execute.call_args_list == [
+        mocker.call(statement) for statement in SCHEMA_STATEMENTS
+    ]
     mock_db_conn.commit.assert_called_once()
     assert repo._connection is mock_db_conn
 
 
+def test_create_from_template(mocker, mock_env, monkeypatch):
+    """Test that create() clones db_template instead of running the schema."""
+
+    monkeypatch.setenv("db_template", "ledge_template")
+    mock_connect = mocker.patch("psycopg2.connect")
+    mock_admin_conn = mocker.MagicMock()
+    mock_db_conn = mocker.MagicMock()
+    mock_db_conn.closed = 0
+    mock_connect.side_effect = [mock_admin_conn, mock_db_conn]
+
+    repo = PostgreSQLRepository()
+    repo.create()
+
+    mock_admin_conn.cursor.return_value.execute.assert_called_once_with(
+        sql.SQL("CREATE DATABASE {} TEMPLATE {};").format(
+            sql.Identifier("test_db"), sql.Identifier("ledge_template")
+        )
+    )
+    mock_db_conn.cursor.return_value.execute.assert_not_called()
+    assert repo._connection is mock_db_conn
+    repo.close()
+
+
 def test_create_db_exists(mocker, mock_env):
     """Test db exists raises FileExistsError and closes connection in finally."""
 
     mock_connect = mocker.patch("psycopg2.connect")
     mock_conn = mock_connect.return_value
     # insert error with DUPLICATE_DATABASE code
-    error = error_factory("Database already exists", errorcodes.DUPLICATE_DATABASE)
-    mock_conn.cursor.return_value.execute.side_effect = error
+    mock_conn.cursor.return_value.execute.side_effect = _DUP_DB_ERR
     repo = PostgreSQLRepository()
 
     with pytest.raises(FileExistsError, match="Database already exists"):
@@ -160,8 +203,7 @@ def test_create_auth_failure(mocker, mock_env):
     """Test auth failure during create raises ConnectionError."""
 
     mock_connect = mocker.patch("psycopg2.connect")
-    error = error_factory("Fatal error...", errorcodes.INVALID_PASSWORD)
-    mock_connect.side_effect = error
+    mock_connect.side_effect = _AUTH_ERR
     repo = PostgreSQLRepository()
 
     with pytest.raises(ConnectionError, match="Authentication failed"):
@@ -169,14 +211,91 @@ def test_create_auth_failure(mocker, mock_env):
 
 
 def test_close_connection(mocker, mock_env):
-    """Test that close() closes the connection."""
+    """Test that close() returns the connection to the pool."""
 
     mock_connect = mocker.patch("psycopg2.connect")
     mock_conn = mock_connect.return_value
+    mock_conn.closed = 0
 
     repo = PostgreSQLRepository()
     repo.open()
     repo.close()
 
-    mock_conn.close.assert_called_once()
+    mock_conn.close.assert_not_called()
     assert repo._connection is None
+
+    close_pools()
+    mock_conn.close.assert_called_once()
+
+
+def test_open_reuses_pooled_connection(mocker, mock_env):
+    """Test that repositories share a pooled connection instead of reconnecting."""
+
+    mock_connect = mocker.patch("psycopg2.connect")
+    mock_conn = mock_connect.return_value
+    mock_conn.closed = 0
+
+    repo = PostgreSQLRepository()
+    repo.open()
+    repo.close()
+
+    other = PostgreSQLRepository()
+    other.open()
+
+    mock_connect.assert_called_once()
+    assert other._connection is mock_conn
+    other.close()
+
+
+def test_open_replaces_dropped_connection(mocker, mock_env):
+    """Test that open() discards a pooled connection the server has dropped."""
+
+    mock_connect = mocker.patch("psycopg2.connect")
+    dead_conn = mocker.MagicMock()
+    dead_conn.closed = 0
+    ping = dead_conn.cursor.return_value.__enter__.return_value.execute
+    live_conn = mocker.MagicMock()
+    mock_connect.side_effect = [dead_conn, live_conn]
+
+    repo = PostgreSQLRepository()
+    repo.open()
+    # a fresh connection is handed out without a ping
+    ping.assert_not_called()
+    repo.close()
+
+    ping.side_effect = psycopg2.OperationalError(
+        "server closed the connection unexpectedly"
+    )
+    repo.open()
+
+    dead_conn.close.assert_called_once()
+    live_conn.cursor.return_value.__enter__.return_value.execute.assert_not_called()
+    assert repo._connection is live_conn
+    repo.close()
+
+
+def test_pool_size_from_env(mocker, mock_env, monkeypatch):
+    """Test that the pool size can be overridden through the environment."""
+
+    monkeypatch.setenv("postgres_pool_min", "3")
+    monkeypatch.setenv("postgres_pool_max", "5")
+    mock_pool = mocker.patch("ledge.repository.postgresql.pool.ThreadedConnectionPool")
+    mock_pool.return_value.closed = False
+
+    repo = PostgreSQLRepository()
+    repo.open()
+
+    assert mock_pool.call_args.args == (3, 5)
+    repo.close()
+
+
+def test_pool_size_not_an_integer(mocker, mock_env, monkeypatch):
+    """Test that a malformed pool size names the offending variable."""
+
+    monkeypatch.setenv("postgres_pool_max", "lots")
+    mock_connect = mocker.patch("psycopg2.connect")
+
+    repo = PostgreSQLRepository()
+    with pytest.raises(ValueError, match="postgres_pool_max"):
+        repo.open()
+    mock_connect.assert_not_called()